@@ -2,6 +2,8 @@ import os
 import httpx
 from dotenv import load_dotenv
 
+from http_clients import get_client, record_error
+
 load_dotenv()
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
@@ -30,13 +32,16 @@ async def transcribe_audio(audio_bytes: bytes) -> str:
             "Content-Type": "audio/webm",
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
+        try:
+            response = await get_client("deepgram").post(
                 DEEPGRAM_URL,
                 params=params,
                 headers=headers,
                 content=audio_bytes,
             )
+        except httpx.TransportError:
+            record_error("deepgram")
+            raise
 
         if response.status_code != 200:
             print(f"[Deepgram] API error: {response.status_code} {response.text}")
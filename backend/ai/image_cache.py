@@ -0,0 +1,61 @@
+"""
+Size-bounded LRU cache of preprocessed VLM images.
+
+Keyed by (content hash of the source JPEG, max_dim, max_kb) so the same
+source frame analysed twice — e.g. a dashboard snapshot reused across
+cycles, or several analyzers on one frame — skips the resize and the
+re-encode quality loop. Eviction is by total cached bytes, not entry count.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PreprocessCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source: bytes, max_dim: int, max_kb: int) -> tuple:
+        return (hashlib.blake2b(source, digest_size=16).digest(), max_dim, max_kb)
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self._entries[key] = data
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
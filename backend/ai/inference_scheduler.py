@@ -0,0 +1,123 @@
+"""
+Central, priority-aware scheduler for Ollama inference.
+
+Ollama on a single box serves only a few requests at once. Without a
+scheduler an operator's "what is happening in parking" queues behind
+dozens of background monitoring frames. Every inference goes through
+InferenceScheduler.submit() instead:
+
+- Priority classes: INTERACTIVE (voice/text commands) → ALERT_RECHECK → ROUTINE
+- FIFO within a class
+- `concurrency` workers, matched to what the Ollama backend can serve
+  (OLLAMA_NUM_PARALLEL)
+- Queue wait and service time are logged per request and aggregated per class
+
+Vision inference (llava) and the command model (qwen2:1.5b) get separate
+schedulers: Ollama runs each loaded model in its own runner, so a command
+can be served while a multi-second llava inference is in flight instead of
+queueing behind it.
+"""
+import asyncio
+import itertools
+import time
+
+from settings import get_ollama_concurrency, get_ollama_command_concurrency
+
+INTERACTIVE = 0
+ALERT_RECHECK = 1
+ROUTINE = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: "interactive",
+    ALERT_RECHECK: "alert_recheck",
+    ROUTINE: "routine",
+}
+
+
+class InferenceScheduler:
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = max(1, int(concurrency))
+        self._queue: asyncio.PriorityQueue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._in_service = 0
+        self._stats = {
+            name: {"requests": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                   "wait_total": 0.0, "wait_max": 0.0, "service_total": 0.0, "service_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def submit(self, call, priority: int = ROUTINE, label: str = ""):
+        """
+        Queue `call` (a zero-argument function returning an awaitable) and
+        return its result once a worker has run it.
+        """
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        self._stats[PRIORITY_NAMES[priority]]["requests"] += 1
+        await self._queue.put((priority, next(self._seq), time.monotonic(), call, future, label))
+        return await future
+
+    async def _worker(self):
+        while True:
+            priority, _, enqueued, call, future, label = await self._queue.get()
+            stats = self._stats[PRIORITY_NAMES[priority]]
+
+            # Caller gave up (e.g. pipeline timeout) while still queued
+            if future.cancelled():
+                stats["cancelled"] += 1
+                continue
+
+            started = time.monotonic()
+            wait = started - enqueued
+            self._in_service += 1
+            try:
+                result = await call()
+                if not future.cancelled():
+                    future.set_result(result)
+                stats["completed"] += 1
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+                stats["failed"] += 1
+            finally:
+                self._in_service -= 1
+
+            service = time.monotonic() - started
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            stats["service_total"] += service
+            stats["service_max"] = max(stats["service_max"], service)
+            print(f"[Inference] {PRIORITY_NAMES[priority]} {label} — wait {wait:.2f}s, service {service:.2f}s")
+
+    def stats(self) -> dict:
+        classes = {}
+        for name, s in self._stats.items():
+            done = s["completed"] + s["failed"]
+            classes[name] = {
+                "requests": s["requests"],
+                "completed": s["completed"],
+                "failed": s["failed"],
+                "cancelled": s["cancelled"],
+                "avg_wait_seconds": round(s["wait_total"] / done, 3) if done else 0.0,
+                "max_wait_seconds": round(s["wait_max"], 3),
+                "avg_service_seconds": round(s["service_total"] / done, 3) if done else 0.0,
+                "max_service_seconds": round(s["service_max"], 3),
+            }
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_service": self._in_service,
+            "classes": classes,
+        }
+
+
+inference_scheduler = InferenceScheduler(concurrency=get_ollama_concurrency())
+command_scheduler = InferenceScheduler(concurrency=get_ollama_command_concurrency())
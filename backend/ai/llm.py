@@ -1,7 +1,10 @@
-import ollama
+from ai import ollama_client
+from ai.inference_scheduler import command_scheduler, INTERACTIVE
 
+COMMAND_MODEL = "qwen2:1.5b"
 
-SYSTEM_PROMPT = SYSTEM_PROMPT = """
+
+SYSTEM_PROMPT = """
 You are an AI CCTV Voice Agent.
 
 Convert the user's natural language command into STRICT JSON.
@@ -87,25 +90,27 @@ Output:
 
 
 async def analyze_command(transcript: str):
-
+    """LLM slow path for commands the keyword rules didn't match (own lane, never behind llava)."""
     try:
 
-        response = ollama.chat(
-            model="qwen2:1b",
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": transcript
-                }
-            ]
+        return await command_scheduler.submit(
+            lambda: ollama_client.chat(
+                COMMAND_MODEL,
+                [
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": transcript
+                    }
+                ]
+            ),
+            priority=INTERACTIVE,
+            label=COMMAND_MODEL,
         )
 
-        return response["message"]["content"]
-
     except Exception as e:
         print("LLM error:", e)
         return "{}"
@@ -0,0 +1,112 @@
+"""
+Shared async Ollama client with model warm-up and residency checks.
+
+- ONE ollama.AsyncClient (one pooled HTTP connection set) for every command
+  and vision inference, instead of the blocking module-level ollama.chat in
+  a thread per request
+- Every request passes `keep_alive` (settings: ollama_keep_alive) so Ollama
+  keeps the model loaded between bursts of commands
+- warm_models() loads qwen2:1.5b and llava:7b at startup; a background
+  residency check reloads whichever model Ollama has since evicted, so the
+  next operator command doesn't pay a multi-second load
+"""
+import asyncio
+import os
+import time
+
+import ollama
+
+from settings import get_ollama_keep_alive, get_ollama_residency_check_seconds
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST")  # None → ollama's default (localhost:11434)
+
+_client: ollama.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+_residency_task: asyncio.Task | None = None
+_status = {"resident": [], "last_check": None, "loads": 0, "last_error": None}
+
+
+def get_client() -> ollama.AsyncClient:
+    """The shared client (recreated only if the event loop changed)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = ollama.AsyncClient(host=OLLAMA_HOST)
+        _client_loop = loop
+    return _client
+
+
+async def chat(model: str, messages: list, options: dict | None = None, format=None) -> str:
+    response = await get_client().chat(
+        model=model, messages=messages, options=options or {}, format=format,
+        keep_alive=get_ollama_keep_alive(),
+    )
+    return response["message"]["content"]
+
+
+async def warm_models(models: list[str]):
+    """Loads each model into memory (an empty generate request) and keeps it resident."""
+    for model in models:
+        started = time.monotonic()
+        try:
+            await get_client().generate(model=model, prompt="", keep_alive=get_ollama_keep_alive())
+            _status["loads"] += 1
+            print(f"[Ollama] {model} loaded in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            _status["last_error"] = str(e)
+            print(f"[Ollama] Could not load {model}: {e}")
+
+
+async def ensure_resident(models: list[str]) -> list[str]:
+    """Reloads any of `models` Ollama has evicted. Returns the models that were reloaded."""
+    ps = await get_client().ps()
+    resident = {m.model for m in ps.models} | {m.name for m in ps.models}
+    _status["resident"] = sorted(m.model for m in ps.models)
+    _status["last_check"] = time.time()
+
+    missing = [m for m in models if m not in resident]
+    if missing:
+        print(f"[Ollama] Not resident: {', '.join(missing)} — reloading")
+        await warm_models(missing)
+        _status["resident"] = sorted(set(_status["resident"]) | set(missing))
+    return missing
+
+
+async def _residency_loop(models: list[str]):
+    await warm_models(models)
+    while True:
+        interval = get_ollama_residency_check_seconds()
+        await asyncio.sleep(interval if interval > 0 else 60)
+        if interval <= 0:
+            continue
+        try:
+            await ensure_resident(models)
+        except Exception as e:
+            _status["last_error"] = str(e)
+            print(f"[Ollama] Residency check failed: {e}")
+
+
+def start_model_keeper(models: list[str]):
+    """Warm `models` in the background, then keep them resident (called from FastAPI startup)."""
+    global _residency_task
+    if _residency_task is None or _residency_task.done():
+        _residency_task = asyncio.create_task(_residency_loop(models))
+
+
+async def stop_model_keeper():
+    global _residency_task
+    if _residency_task and not _residency_task.done():
+        _residency_task.cancel()
+        try:
+            await _residency_task
+        except asyncio.CancelledError:
+            pass
+    _residency_task = None
+
+
+def get_ollama_status() -> dict:
+    return {
+        "host": OLLAMA_HOST or "default",
+        "keep_alive": get_ollama_keep_alive(),
+        **_status,
+    }
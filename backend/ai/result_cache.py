@@ -0,0 +1,103 @@
+"""
+Perceptual-hash cache of VLM results.
+
+Static scenes (night shifts, idle looms) produce near-identical frames every
+cycle. Each frame gets a 64-bit dHash; a new frame from the same camera with
+the same prompt whose hash is within `max_distance` bits of a cached one
+(and younger than `ttl`) reuses that analysis instead of a llava inference.
+
+An entry is reused at most `max_reuses` times; after that the next frame
+gets a fresh inference, so a cached "normal" verdict can't hide a slowly
+changing scene for the whole ttl.
+"""
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+
+def dhash(image: bytes, size: int = 8) -> int:
+    """Difference hash: compare adjacent pixels of a (size+1)x size grayscale thumbnail."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image))
+    img.draft('L', (size * 8, size * 8))  # JPEG: decode at reduced scale
+    pixels = list(img.convert('L').resize((size + 1, size), Image.BILINEAR).getdata())
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class ResultCache:
+    def __init__(self, max_keys: int = 2048, entries_per_key: int = 4):
+        self.max_keys = max_keys
+        self.entries_per_key = entries_per_key
+        self.hits = 0
+        self.misses = 0
+        self.reuse_limited = 0
+        # (camera_id, prompt digest) -> list of entries, newest last
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(camera_id: str, prompt: str) -> tuple:
+        return (camera_id, hashlib.blake2b(prompt.encode(), digest_size=8).digest())
+
+    def lookup(self, camera_id: str, prompt: str, phash: int, ttl: float, max_distance: int,
+               max_reuses: int = 0) -> dict | None:
+        """
+        Closest fresh result within max_distance bits, or None.
+        Returns {"result", "age", "distance"} — age in seconds since the original inference.
+        """
+        now = time.time()
+        key = self._key(camera_id, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries:
+                entries[:] = [e for e in entries if now - e["created"] <= ttl]
+                best = min(entries, key=lambda e: hamming(e["phash"], phash), default=None)
+                distance = hamming(best["phash"], phash) if best else None
+                if best and distance <= max_distance:
+                    if max_reuses and best["hits"] >= max_reuses:
+                        # Reused enough — re-infer; the fresh result replaces it
+                        entries.remove(best)
+                        self.reuse_limited += 1
+                    else:
+                        best["hits"] += 1
+                        best["last_hit"] = now
+                        self.hits += 1
+                        self._entries.move_to_end(key)
+                        return {"result": best["result"], "age": now - best["created"], "distance": distance}
+            self.misses += 1
+            return None
+
+    def store(self, camera_id: str, prompt: str, phash: int, result: str):
+        key = self._key(camera_id, prompt)
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            entries.append({"phash": phash, "result": result, "created": time.time(), "hits": 0, "last_hit": None})
+            del entries[:-self.entries_per_key]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "keys": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reuse_limited": self.reuse_limited,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
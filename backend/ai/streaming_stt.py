@@ -0,0 +1,107 @@
+"""
+Streaming speech-to-text backends for the /voice/stream WebSocket.
+
+A backend consumes audio chunks as the operator speaks and yields transcript
+events while they are still talking:
+
+    async for event in backend.stream(chunks):   # chunks: AsyncIterator[bytes]
+        event.text, event.is_final, event.speech_final
+
+- DeepgramStreamingSTT — Deepgram live API (interim results + endpointing)
+- StubStreamingSTT     — offline stand-in: each chunk is UTF-8 text, emitted
+                         as a growing interim transcript, final at the end
+
+STT_BACKEND=deepgram (default) | stub selects the backend.
+"""
+import json
+import os
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+DEEPGRAM_LIVE_URL = "wss://api.deepgram.com/v1/listen"
+STT_BACKEND = os.getenv("STT_BACKEND", "deepgram")
+
+
+@dataclass
+class TranscriptEvent:
+    text: str
+    is_final: bool = False       # this segment's text won't change any more
+    speech_final: bool = False   # the speaker paused — the utterance is complete
+
+
+class StubStreamingSTT:
+    name = "stub"
+
+    async def stream(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[TranscriptEvent]:
+        words = []
+        async for chunk in chunks:
+            words.extend(chunk.decode("utf-8", errors="ignore").split())
+            yield TranscriptEvent(" ".join(words))
+        yield TranscriptEvent(" ".join(words), is_final=True, speech_final=True)
+
+
+class DeepgramStreamingSTT:
+    name = "deepgram"
+
+    params = {
+        "model": "nova-2",
+        "language": "en-IN",
+        "punctuate": "true",
+        "smart_format": "true",
+        "interim_results": "true",
+        "endpointing": "300",    # ms of silence that ends an utterance (speech_final)
+    }
+
+    async def stream(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[TranscriptEvent]:
+        import websockets  # only needed for live transcription
+
+        url = f"{DEEPGRAM_LIVE_URL}?{urlencode(self.params)}"
+        async with websockets.connect(url, additional_headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"}) as ws:
+
+            async def send_audio():
+                async for chunk in chunks:
+                    await ws.send(chunk)
+                # Flush remaining audio and let Deepgram close the stream
+                await ws.send(json.dumps({"type": "CloseStream"}))
+
+            sender = asyncio.create_task(send_audio())
+            finalized = []   # is_final segments of the current utterance
+            try:
+                async for message in ws:
+                    data = json.loads(message)
+                    if data.get("type") != "Results":
+                        continue
+                    text = data["channel"]["alternatives"][0]["transcript"].strip()
+                    is_final = data.get("is_final", False)
+                    speech_final = data.get("speech_final", False)
+
+                    # Interim text only covers the current segment; prepend finished ones
+                    full = " ".join(finalized + ([text] if text else []))
+                    if is_final and text:
+                        finalized.append(text)
+                    if full or speech_final:
+                        yield TranscriptEvent(full, is_final=is_final, speech_final=speech_final)
+                    if speech_final:
+                        finalized = []
+            finally:
+                sender.cancel()
+
+
+_BACKENDS = {
+    "deepgram": DeepgramStreamingSTT,
+    "stub": StubStreamingSTT,
+}
+
+
+def get_streaming_stt(name: str | None = None):
+    backend = _BACKENDS.get(name or STT_BACKEND)
+    if backend is None:
+        raise ValueError(f"Unknown STT backend: {name or STT_BACKEND}")
+    return backend()
@@ -1,40 +1,72 @@
-import asyncio
-import ollama
+from typing import Literal
+from pydantic import BaseModel, Field, ValidationError
 
+from ai.image_cache import PreprocessCache
+from ai.result_cache import ResultCache, dhash
+from ai.inference_scheduler import inference_scheduler, INTERACTIVE, ROUTINE
+from ai import ollama_client
+from settings import get_preprocess_cache_mb, is_vlm_cache_enabled, get_vlm_cache_limits
 
-# ── Shared asyncio loop for blocking ollama calls ──────────────────────────
 
-def _call_ollama(model: str, messages: list, options: dict) -> str:
-    """Synchronous wrapper — called via run_in_executor so it doesn't block the event loop."""
-    response = ollama.chat(model=model, messages=messages, options=options)
-    return response["message"]["content"]
+# ── Ollama calls, scheduled by priority ───────────────────────────────────
 
-
-async def _async_ollama(model: str, messages: list, options: dict | None = None) -> str:
-    """Non-blocking async wrapper around ollama.chat."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None,
-        lambda: _call_ollama(model, messages, options or {})
+async def _async_ollama(model: str, messages: list, options: dict | None = None,
+                        priority: int = ROUTINE, label: str = "", format=None) -> str:
+    """
+    Chat request on the shared async Ollama client, queued on the central inference scheduler.
+    `format` is passed to Ollama's structured-output mode ("json" or a JSON schema).
+    """
+    return await inference_scheduler.submit(
+        lambda: ollama_client.chat(model, messages, options, format),
+        priority=priority,
+        label=label or model,
     )
 
 
 # ── Image preprocessing ────────────────────────────────────────────────────
+# Frames travel as one in-memory JPEG buffer: capture → validate → preprocess
+# → ollama (as image bytes). A str is still accepted and treated as a file path
+# (e.g. dashboard snapshots already on disk).
+
+_preprocess_cache = PreprocessCache(max_bytes=get_preprocess_cache_mb() * 1024 * 1024)
+
+
+def get_preprocess_cache_stats() -> dict:
+    return _preprocess_cache.stats()
+
 
-def _preprocess_image(image_path: str, max_dim: int = 720, max_kb: int = 300) -> str:
+def _image_bytes(image: str | bytes) -> bytes:
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def _preprocess_image(image: str | bytes, max_dim: int = 720, max_kb: int = 300) -> bytes:
     """
     Resizes image to max_dim (default 720p) and compresses to under max_kb.
-    Returns either original path or a temp resized path.
-    Does not modify the original file.
+    Returns the encoded JPEG bytes — the original buffer untouched when it is
+    already a small-enough JPEG (the common case for captured frames), or a
+    cached result when the same source was preprocessed before.
     """
+    data = _image_bytes(image)
     try:
         from PIL import Image
-        import io, os, tempfile
+        import io
 
-        img = Image.open(image_path)
+        img = Image.open(io.BytesIO(data))
 
-        # Resize if larger than max_dim on any side
+        # Already within limits — skip the decode/re-encode entirely
         w, h = img.size
+        if img.format == "JPEG" and max(w, h) <= max_dim and len(data) <= max_kb * 1024:
+            return data
+
+        cache_key = PreprocessCache.key(data, max_dim, max_kb)
+        cached = _preprocess_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Resize if larger than max_dim on any side
         if max(w, h) > max_dim:
             scale = max_dim / max(w, h)
             img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
@@ -43,7 +75,7 @@ def _preprocess_image(image_path: str, max_dim: int = 720, max_kb: int = 300) ->
         if img.mode != 'RGB':
             img = img.convert('RGB')
 
-        # Save to temp file, compressing until under max_kb
+        # Compress until under max_kb
         quality = 85
         while quality >= 40:
             buf = io.BytesIO()
@@ -52,18 +84,16 @@ def _preprocess_image(image_path: str, max_dim: int = 720, max_kb: int = 300) ->
                 break
             quality -= 10
 
-        tmp = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-        tmp.write(buf.getvalue())
-        tmp.close()
         print(f"[VLM] Image preprocessed → {img.size[0]}x{img.size[1]}, {len(buf.getvalue())//1024}KB")
-        return tmp.name
+        _preprocess_cache.put(cache_key, buf.getvalue())
+        return buf.getvalue()
 
     except Exception as e:
         print(f"[VLM] Image preprocess warning: {e} — using original")
-        return image_path
+        return data
 
 
-def _validate_image(image_path: str) -> str | None:
+def _validate_image(image: str | bytes) -> str | None:
     """
     Validates the image before sending to VLM.
     Returns error string if image is black/empty/too small, else None.
@@ -72,16 +102,19 @@ def _validate_image(image_path: str) -> str | None:
     - Black/empty frames (mean pixel value < 5)
     - Tiny files < 1KB (corrupt or incomplete)
     """
-    import os
     try:
-        size_kb = os.path.getsize(image_path) / 1024
+        data = _image_bytes(image)
+        size_kb = len(data) / 1024
         if size_kb < 1.0:
             return f"Image too small ({size_kb:.1f}KB) — likely corrupt or empty frame"
 
         from PIL import Image
         import numpy as np
-        img = Image.open(image_path).convert('RGB')
-        arr = np.array(img)
+        import io
+        img = Image.open(io.BytesIO(data))
+        # JPEG draft mode decodes at 1/8 scale — plenty for a brightness check
+        img.draft('RGB', (max(1, img.size[0] // 8), max(1, img.size[1] // 8)))
+        arr = np.asarray(img.convert('RGB'))
         mean_brightness = arr.mean()
         if mean_brightness < 15.0:
             return f"Image is nearly black (brightness={mean_brightness:.1f}) — stream not ready"
@@ -125,17 +158,66 @@ MODEL = "llava:7b"
 # Reduce context window to 2048 to save ~1GB RAM vs. default 4096
 VLM_OPTIONS = {"num_ctx": 2048}
 
+_result_cache = ResultCache()
+
 
-async def analyze_image(image_path: str, command: dict) -> str:
+class InferenceResult(str):
+    """VLM output text; `cached` results were reused from an earlier, near-identical frame."""
+    cached: bool = False
+    cache_age: float | None = None       # seconds since the reused inference ran
+    cache_distance: int | None = None    # dHash bits between that frame and this one
+
+    @classmethod
+    def from_cache(cls, hit: dict) -> "InferenceResult":
+        result = cls(hit["result"])
+        result.cached = True
+        result.cache_age = hit["age"]
+        result.cache_distance = hit["distance"]
+        return result
+
+
+async def _infer(prompt: str, image: bytes, camera_id: str | None = None,
+                 priority: int = ROUTINE, label: str = "", format=None) -> InferenceResult:
+    """
+    Run one VLM inference. When camera_id is given, a near-identical frame
+    (dHash within vlm_cache_max_distance bits) analysed with the same prompt
+    within vlm_cache_ttl_seconds is served from the result cache instead —
+    marked `cached`, at most vlm_cache_max_reuses times per inference.
+    """
+    phash = None
+    if camera_id and is_vlm_cache_enabled():
+        phash = dhash(image)
+        ttl, max_distance, max_reuses = get_vlm_cache_limits()
+        hit = _result_cache.lookup(camera_id, prompt, phash, ttl, max_distance, max_reuses)
+        if hit is not None:
+            print(f"[VLM Cache] Served from cache for camera {camera_id} "
+                  f"(static scene, {hit['age']:.0f}s old, {hit['distance']} bits apart)")
+            return InferenceResult.from_cache(hit)
+
+    result = await _async_ollama(MODEL, [
+        {"role": "user", "content": prompt, "images": [image]}
+    ], VLM_OPTIONS, priority=priority, label=label or (camera_id or ""), format=format)
+    result = _sanitize_vlm_output(result)
+
+    if phash is not None and "SKIPPED" not in result.upper():
+        _result_cache.store(camera_id, prompt, phash, result)
+    return InferenceResult(result)
+
+
+def get_result_cache_stats() -> dict:
+    return _result_cache.stats()
+
+
+async def analyze_image(image: str | bytes, command: dict, priority: int = INTERACTIVE) -> str:
     """Forensic CCTV analysis for user-triggered vision commands."""
     action = command.get("action", "analyze")
 
-    err = _validate_image(image_path)
+    err = _validate_image(image)
     if err:
         print(f"[VLM] Skipping analyze_image: {err}")
         return f"[Skipped] {err}"
 
-    processed = _preprocess_image(image_path)
+    processed = _preprocess_image(image)
 
     prompt = f"""You are a forensic CCTV analyst.
 User intent: {action}
@@ -150,21 +232,18 @@ Analyze the image and provide:
 
 Be concise but thorough."""
 
-    result = await _async_ollama(MODEL, [
-        {"role": "user", "content": prompt, "images": [processed]}
-    ], VLM_OPTIONS)
-
-    return _sanitize_vlm_output(result)
+    return await _infer(prompt, processed, priority=priority, label=action)
 
 
-async def analyze_for_alert(image_path: str) -> str:
+async def analyze_for_alert(image: str | bytes, camera_id: str | None = None,
+                            priority: int = ROUTINE) -> str:
     """Quick alert detection — respond only ALERT or NORMAL."""
-    err = _validate_image(image_path)
+    err = _validate_image(image)
     if err:
         print(f"[VLM] Skipping analyze_for_alert: {err}")
         return f"NO THREAT DETECTED: {err}"
 
-    processed = _preprocess_image(image_path)
+    processed = _preprocess_image(image)
 
     prompt = """You are a security monitoring AI. Look at this CCTV frame.
 
@@ -176,20 +255,18 @@ Respond with ONE of:
 
 Be direct. No extra text."""
 
-    result = await _async_ollama(MODEL, [
-        {"role": "user", "content": prompt, "images": [processed]}
-    ], VLM_OPTIONS)
-    return _sanitize_vlm_output(result)
+    return await _infer(prompt, processed, camera_id, priority)
 
 
-async def analyze_industrial_safety(image_path: str) -> str:
+async def analyze_industrial_safety(image: str | bytes, camera_id: str | None = None,
+                                    priority: int = ROUTINE) -> str:
     """Cotton mill safety check — PPE, fire, machinery, headcount."""
-    err = _validate_image(image_path)
+    err = _validate_image(image)
     if err:
         print(f"[VLM] Skipping analyze_industrial_safety: {err}")
         return f"STATUS: SKIPPED — {err}"
 
-    processed = _preprocess_image(image_path)
+    processed = _preprocess_image(image)
 
     prompt = """You are an Industrial Safety AI for a cotton mill.
 
@@ -206,19 +283,17 @@ Analyze the CCTV frame and report:
 
 Be precise. One finding per line."""
 
-    result = await _async_ollama(MODEL, [
-        {"role": "user", "content": prompt, "images": [processed]}
-    ], VLM_OPTIONS)
-    return _sanitize_vlm_output(result)
+    return await _infer(prompt, processed, camera_id, priority)
 
 
-async def analyze_smart_security(image_path: str) -> str:
+async def analyze_smart_security(image: str | bytes, camera_id: str | None = None,
+                                 priority: int = ROUTINE) -> str:
     """Advanced Nemotron-style reasoning for complex security events."""
-    err = _validate_image(image_path)
+    err = _validate_image(image)
     if err:
         return f"STATUS: SKIPPED — {err}"
 
-    processed = _preprocess_image(image_path)
+    processed = _preprocess_image(image)
 
     prompt = """You are an NVIDIA Nemotron-powered Multimodal AI Agent specialized in security.
 Analyze this CCTV frame for complex behavioral patterns.
@@ -235,8 +310,136 @@ OUTPUT FORMAT:
 
 Be decisive and focus on high-risk visual cues."""
 
-    result = await _async_ollama(MODEL, [
-        {"role": "user", "content": prompt, "images": [processed]}
-    ], VLM_OPTIONS)
-    return _sanitize_vlm_output(result)
+    return await _infer(prompt, processed, camera_id, priority)
+
+
+
+# ── Combined single-pass analyzer (structured JSON output) ─────────────────
+# One inference answers both the security checks (analyze_smart_security)
+# and the mill safety checks (analyze_industrial_safety). Ollama's
+# structured-output mode constrains llava to the CombinedFindings schema.
+
+class CombinedFindings(BaseModel):
+    scene: str = Field("", description="One-sentence description of the scene")
+    people_count: int = Field(0, ge=0)
+    security_threats: list[str] = Field(default_factory=list, description=(
+        "Any of: loitering, unattended baggage, unauthorized access, suspicious behavior, "
+        "intrusion, weapon, person in distress, property damage"))
+    ppe_violations: list[str] = Field(default_factory=list, description=(
+        "Missing gear per worker, e.g. 'no mask', 'no gloves', 'no vest'"))
+    fire_or_smoke: bool = False
+    machinery_status: Literal["running", "idle", "jammed", "none", "unknown"] = "unknown"
+    alert: bool = Field(False, description="True if any threat or violation was found")
+    summary: str = Field("", description="2-3 sentence reasoning about the visual evidence")
+
+
+class CombinedAnalysis(CombinedFindings):
+    """Parsed result of analyze_combined (findings + skip status)."""
+    skipped: bool = False
+    skip_reason: str = ""
+    cached: bool = False                  # findings reused from an earlier frame (result cache)
+    cache_age: float | None = None
+
+    @property
+    def findings(self) -> list[str]:
+        found = list(self.security_threats) + list(self.ppe_violations)
+        if self.fire_or_smoke:
+            found.append("fire or smoke")
+        if self.machinery_status in ("idle", "jammed"):
+            found.append(f"machine {self.machinery_status}")
+        return found
+
+    @property
+    def is_alert(self) -> bool:
+        return not self.skipped and (self.alert or bool(self.findings))
+
+    def to_message(self) -> str:
+        """Same text conventions as the free-text analyzers, for alert keyword matching and storage."""
+        if self.skipped:
+            return f"STATUS: SKIPPED — {self.skip_reason}"
+        if self.is_alert:
+            threats = ", ".join(self.findings) or "unspecified threat"
+            return f"ALERT DETECTED: {threats}. Analysis: {self.summary or self.scene}"
+        return f"STATUS: NORMAL. Observation: {self.scene or self.summary} (people: {self.people_count})"
+
+
+_COMBINED_SCHEMA = CombinedFindings.model_json_schema()
+
+
+async def analyze_combined(image: str | bytes, camera_id: str | None = None,
+                           priority: int = ROUTINE) -> CombinedAnalysis:
+    """Security + industrial safety findings from a single structured VLM inference."""
+    err = _validate_image(image)
+    if err:
+        return CombinedAnalysis(skipped=True, skip_reason=err)
+
+    processed = _preprocess_image(image)
+
+    prompt = """You are a security and industrial-safety AI for a cotton mill, analysing one CCTV frame.
+
+Check ALL of the following and fill every field of the JSON schema:
+1. SECURITY: loitering, unattended baggage, unauthorized access (fences, restricted zones, tailgating),
+   suspicious behavior (concealed face, rapid movements, watching cameras), weapons, people in distress.
+2. PEOPLE: exact number of people visible.
+3. PPE: are ALL workers wearing mask, gloves and vest? List each missing item.
+4. FIRE & SMOKE: spindle fires, embers, smoke, sparks.
+5. MACHINERY: are spinning frames/looms running, idle or jammed? Use "none" if no machinery is visible.
+
+Set "alert" to true if any threat or violation is found. Leave lists empty when nothing is found.
+Respond with JSON only."""
+
+    raw = await _infer(prompt, processed, camera_id, priority, format=_COMBINED_SCHEMA)
+    if "SKIPPED" in raw.upper()[:40]:
+        return CombinedAnalysis(skipped=True, skip_reason=raw)
+
+    try:
+        analysis = CombinedAnalysis.model_validate_json(raw)
+        analysis.cached, analysis.cache_age = raw.cached, raw.cache_age
+        return analysis
+    except ValidationError as e:
+        print(f"[VLM] Combined analyzer returned invalid JSON: {repr(raw[:120])} ({e.error_count()} errors)")
+        return CombinedAnalysis(skipped=True, skip_reason="VLM returned invalid JSON")
+
+
+# ── Mosaic sweep (several cameras per inference) ───────────────────────────
+
+class TileFinding(BaseModel):
+    label: str = Field(description="Tile letter printed in the top-left corner")
+    suspicious: bool = Field(description="True if anything in this tile may need a closer look")
+    finding: str = Field("", description="One short sentence about this tile")
+
+
+class MosaicFindings(BaseModel):
+    tiles: list[TileFinding]
+
+
+_MOSAIC_SCHEMA = MosaicFindings.model_json_schema()
+
+
+async def analyze_mosaic(mosaic: bytes, labels: list[str], priority: int = ROUTINE) -> dict[str, TileFinding]:
+    """
+    Screen a labelled grid of camera tiles in one inference.
+    Returns label -> TileFinding. Tiles the VLM did not report on (or all
+    tiles, if the output is unusable) come back as suspicious so they get a
+    full-resolution re-check rather than being silently cleared.
+    """
+    def unresolved(label: str, why: str) -> TileFinding:
+        return TileFinding(label=label, suspicious=True, finding=why)
+
+    prompt = f"""You are a security and industrial-safety AI for a cotton mill.
+This image is a grid of {len(labels)} CCTV camera tiles, each labelled with a letter in its top-left corner: {", ".join(labels)}.
+
+For EVERY tile, report whether anything may need a closer look: fire, smoke, intrusion, loitering,
+unattended bags, suspicious behavior, workers missing mask/gloves/vest, idle or jammed machinery.
+Set "suspicious" to false only if the tile clearly shows a normal scene.
+Respond with JSON only."""
+
+    raw = await _infer(prompt, mosaic, priority=priority, label=f"mosaic x{len(labels)}", format=_MOSAIC_SCHEMA)
+    try:
+        parsed = MosaicFindings.model_validate_json(raw)
+    except ValidationError:
+        print(f"[VLM] Mosaic analyzer returned invalid JSON: {repr(raw[:120])}")
+        return {label: unresolved(label, "mosaic output unusable") for label in labels}
 
+    by_label = {t.label.strip().upper(): t for t in parsed.tiles}
+    return {label: by_label.get(label) or unresolved(label, "tile not reported") for label in labels}
@@ -0,0 +1,114 @@
+"""
+Alert deduplication / cooldown.
+
+A persistent condition (a parked bag, a loom idle all shift) is reported by
+the VLM every cycle. A new alert is treated as a repeat of an open one when:
+
+- same camera and same primary threat category, and
+- the open alert was last seen within `cooldown_seconds`, and
+- the message is similar (word Jaccard ≥ min_message_similarity)
+  OR the frame's dHash is within max_frame_distance bits
+
+A repeat bumps `occurrences` / `lastSeen` on the existing row instead of
+inserting a new one and notifying again. The most recent alert per
+(camera, category) is tracked in memory; after a restart it is looked up once
+from the database.
+"""
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from ai.result_cache import hamming
+from models import Alert
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _word_set(message: str) -> frozenset:
+    return frozenset(_WORD_RE.findall((message or "").lower()))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class AlertDeduplicator:
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        # (camera_id, category) → {"alert_id", "last_seen", "words", "phash"}
+        self._open: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.repeats = 0
+        self.new = 0
+
+    def _recall(self, db, camera_id: str, category: str, since: datetime) -> dict | None:
+        key = (camera_id, category)
+        with self._lock:
+            entry = self._open.get(key)
+        if entry is not None:
+            return entry
+
+        # Not seen since startup — one indexed lookup for the latest open alert
+        alert = (db.query(Alert)
+                 .filter(Alert.cameraId == camera_id, Alert.category == category,
+                         Alert.lastSeen >= since)
+                 .order_by(Alert.timestamp.desc())
+                 .first())
+        if alert is None:
+            return None
+        entry = {"alert_id": alert.id, "last_seen": alert.lastSeen or alert.timestamp,
+                 "words": _word_set(alert.message), "phash": None}
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: tuple, entry: dict):
+        with self._lock:
+            self._open[key] = entry
+            self._open.move_to_end(key)
+            while len(self._open) > self.capacity:
+                self._open.popitem(last=False)
+
+    def find_repeat(self, db, camera_id: str, category: str, message: str,
+                    phash: int | None, config: dict) -> Alert | None:
+        """The open alert this one repeats, or None."""
+        now = datetime.utcnow()
+        entry = self._recall(db, camera_id, category, now - timedelta(seconds=config["cooldown_seconds"]))
+        if entry is None or (now - entry["last_seen"]).total_seconds() > config["cooldown_seconds"]:
+            return None
+
+        similar = _jaccard(entry["words"], _word_set(message)) >= config["min_message_similarity"]
+        if not similar and phash is not None and entry["phash"] is not None:
+            similar = hamming(phash, entry["phash"]) <= config["max_frame_distance"]
+        if not similar:
+            return None
+
+        alert = db.get(Alert, entry["alert_id"])
+        if alert is None:
+            # Deleted from the dashboard — the next one is a new alert
+            with self._lock:
+                self._open.pop((camera_id, category), None)
+        return alert
+
+    def record_repeat(self, db, alert: Alert, message: str, phash: int | None):
+        now = datetime.utcnow()
+        alert.occurrences = (alert.occurrences or 1) + 1
+        alert.lastSeen = now
+        db.commit()
+        self.repeats += 1
+        entry = {"alert_id": alert.id, "last_seen": now, "words": _word_set(message), "phash": phash}
+        self._store((alert.cameraId, alert.category), entry)
+
+    def record_new(self, alert: Alert, phash: int | None):
+        self.new += 1
+        entry = {"alert_id": alert.id, "last_seen": alert.timestamp or datetime.utcnow(),
+                 "words": _word_set(alert.message), "phash": phash}
+        self._store((alert.cameraId, alert.category), entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tracked = len(self._open)
+        return {"tracked": tracked, "new": self.new, "repeats": self.repeats}
+
+
+alert_dedup = AlertDeduplicator()
@@ -0,0 +1,124 @@
+"""
+In-process broadcast hub for new alerts.
+
+handle_alert() publishes each persisted alert (and again whenever a repeat
+bumps its occurrence count); every open dashboard receives it over WebSocket
+(/alerts/ws) or Server-Sent Events (/alerts/stream) instead of polling the
+database.
+
+- Publishing never blocks: each client has its own bounded queue. A client
+  that falls behind has its backlog dropped and receives a "resync" event,
+  telling it to catch up through GET /alerts?since=...
+- Every published event gets its own id "<boot>-<seq>" (the alert id is in
+  its data), so an alert re-published after a repeat never shadows the
+  events in between.
+- The last HISTORY_SIZE events are kept in a ring buffer, so a reconnecting
+  client that sends the last event id it saw gets the missed events replayed.
+  An id that is no longer in the buffer (or from before a restart) → "resync".
+"""
+import asyncio
+import itertools
+import uuid
+from collections import deque
+
+CLIENT_BUFFER = 100
+HISTORY_SIZE = 500
+
+RESYNC = {"event": "resync", "id": None, "data": {}}
+
+
+def alert_to_event(alert) -> dict:
+    data = {
+        "id": alert.id,
+        "cameraId": alert.cameraId,
+        "cameraName": alert.cameraName,
+        "message": alert.message,
+        "severity": alert.severity,
+        "category": alert.category,
+        "categories": alert.categories,
+        "timestamp": alert.timestamp.isoformat() if alert.timestamp else None,
+        "imagePath": alert.imagePath,
+        "occurrences": alert.occurrences or 1,
+        "lastSeen": alert.lastSeen.isoformat() if alert.lastSeen else None,
+    }
+    return {"event": "alert", "id": alert.id, "data": data}
+
+
+class Subscriber:
+    def __init__(self, sub_id: int, buffer: int):
+        self.id = sub_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow — discard the backlog and let the client catch up from the API
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def next(self, timeout: float | None = None) -> dict | None:
+        """Next event, or None if nothing arrived within timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AlertHub:
+    def __init__(self, client_buffer: int = CLIENT_BUFFER, history: int = HISTORY_SIZE):
+        self.client_buffer = client_buffer
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: dict[int, Subscriber] = {}
+        self._ids = itertools.count(1)
+        self._boot = uuid.uuid4().hex[:8]   # ids from an earlier process never resume here
+        self._seq = 0
+        self.published = 0
+
+    def publish(self, event: dict):
+        self._seq += 1
+        event = {**event, "id": f"{self._boot}-{self._seq}", "seq": self._seq}
+        self._history.append(event)
+        self.published += 1
+        for sub in list(self._subscribers.values()):
+            sub.offer(event)
+
+    def _parse_event_id(self, event_id: str) -> int | None:
+        boot, _, seq = str(event_id).partition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, last_event_id: str | None = None) -> Subscriber:
+        sub = Subscriber(next(self._ids), self.client_buffer)
+        if last_event_id:
+            seq = self._parse_event_id(last_event_id)
+            oldest = self._history[0]["seq"] if self._history else self._seq + 1
+            if seq is not None and oldest - 1 <= seq <= self._seq:
+                for event in self._history:
+                    if event["seq"] > seq:
+                        sub.offer(event)
+            else:
+                sub.offer(RESYNC)
+        self._subscribers[sub.id] = sub
+        print(f"[AlertHub] Client {sub.id} connected ({len(self._subscribers)} open)")
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        if self._subscribers.pop(sub.id, None) is not None:
+            print(f"[AlertHub] Client {sub.id} disconnected ({len(self._subscribers)} open)")
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._subscribers),
+            "published": self.published,
+            "history": len(self._history),
+            "client_buffer": self.client_buffer,
+            "dropped": sum(s.dropped for s in self._subscribers.values()),
+        }
+
+
+alert_hub = AlertHub()
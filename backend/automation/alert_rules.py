@@ -0,0 +1,123 @@
+"""
+Compiled alert rule engine for VLM output classification.
+
+Every pattern of every rule (alert_rules + plain alert_keywords from settings)
+is compiled into ONE case-insensitive regex with a named group per pattern,
+longest patterns first so "static machine" wins over "machine". A single
+finditer pass returns every matched rule with its category and severity.
+
+Patterns match whole words only ("motion" does not match "motionless"), so
+a rule lists the inflections it should catch ("fire", "fires", ...).
+A match preceded by a negation in the same clause ("No fire or smoke
+visible", "not loitering") is ignored.
+
+The engine is rebuilt only when the settings snapshot changes
+(settings.get_version()), not per camera.
+"""
+import re
+import threading
+
+from settings import get_alert_rules, get_alert_keywords, get_version
+
+SEVERITY_RANK = {"info": 0, "warning": 1, "critical": 2}
+
+# A negation this many words or fewer before a match (same clause) cancels it
+NEGATIONS = {"no", "not", "never", "nor", "none", "isn't", "aren't", "wasn't", "weren't"}
+NEGATION_WINDOW = 4
+_CLAUSE_BREAK_RE = re.compile(r"[.;:!?,]|\bbut\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Free-text analyzers mark threats with this phrase even when no keyword matched;
+# it only counts when no specific rule did (it must never become the primary category)
+_VLM_ALERT_RULE = {"category": "vlm_alert", "severity": "warning", "patterns": ["ALERT DETECTED"]}
+
+
+class AlertRuleEngine:
+    def __init__(self, rules: list, keywords: list):
+        self.rules = [dict(r) for r in rules]
+
+        # Plain keywords not already covered by a rule become their own rule
+        covered = {p.lower() for r in self.rules for p in r.get("patterns", ())}
+        for kw in keywords:
+            if kw.lower() not in covered:
+                self.rules.append({"category": "keyword", "severity": "warning", "patterns": [kw]})
+                covered.add(kw.lower())
+        self.rules.append(dict(_VLM_ALERT_RULE))
+        self._fallback = len(self.rules) - 1
+
+        # (pattern, rule index), longest first so the regex prefers the most specific phrase
+        patterns = sorted(
+            ((p, i) for i, r in enumerate(self.rules) for p in r.get("patterns", ()) if p),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._group_rule = {}
+        parts = []
+        for n, (pattern, rule_index) in enumerate(patterns):
+            group = f"p{n}"
+            self._group_rule[group] = rule_index
+            regex = re.escape(pattern)
+            if pattern[0].isalnum():
+                regex = rf"\b{regex}"
+            if pattern[-1].isalnum():
+                regex = rf"{regex}\b"
+            parts.append(rf"(?P<{group}>{regex})")
+        self._regex = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def classify(self, text: str) -> list[dict]:
+        """All rules matched by text, highest severity first (one pass over the text)."""
+        if not text or self._regex is None:
+            return []
+        found = {}
+        for m in self._regex.finditer(text):
+            rule_index = self._group_rule[m.lastgroup]
+            if rule_index not in found and not _negated(text, m):
+                rule = self.rules[rule_index]
+                found[rule_index] = {
+                    "category": rule.get("category", "keyword"),
+                    "severity": rule.get("severity", "warning"),
+                    "match": m.group(0),
+                }
+        if len(found) > 1:
+            found.pop(self._fallback, None)
+        return sorted(found.values(), key=lambda r: SEVERITY_RANK.get(r["severity"], 1), reverse=True)
+
+
+def _negated(text: str, m: re.Match) -> bool:
+    """True if a negation word closely precedes the match within the same clause."""
+    first = _WORD_RE.match(m.group(0).lower())
+    if first and first.group(0) in NEGATIONS:
+        return False  # the pattern is itself a negative finding ("no gloves")
+    before = text[max(0, m.start() - 80):m.start()]
+    breaks = list(_CLAUSE_BREAK_RE.finditer(before))
+    if breaks:
+        before = before[breaks[-1].end():]
+    words = _WORD_RE.findall(before.lower())[-NEGATION_WINDOW:]
+    return any(w in NEGATIONS for w in words)
+
+
+_engine: AlertRuleEngine | None = None
+_engine_version = -1
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AlertRuleEngine:
+    """Engine for the current settings snapshot (rebuilt only after a settings change)."""
+    global _engine, _engine_version
+    version = get_version()
+    if _engine is None or _engine_version != version:
+        with _engine_lock:
+            if _engine is None or _engine_version != version:
+                _engine = AlertRuleEngine(get_alert_rules(), get_alert_keywords())
+                _engine_version = version
+    return _engine
+
+
+def classify(text: str) -> list[dict]:
+    return get_engine().classify(text)
+
+
+def summarize(matches: list[dict]) -> tuple[str, str, list[str]]:
+    """(severity, primary category, all categories) for a non-empty match list."""
+    categories = list(dict.fromkeys(m["category"] for m in matches))
+    return matches[0]["severity"], matches[0]["category"], categories
@@ -2,11 +2,26 @@ import os
 import glob
 import uuid
 import asyncio
-import httpx
-from vision.camera_capture import capture_frame
+from datetime import datetime, timezone
+from vision.camera_capture import capture_jpeg_async, save_jpeg
 from vision.dashboard_capture import get_latest_dashboard_snapshot
-from ai.vision_llm import analyze_smart_security
-from settings import get_max_screenshots, get_alert_keywords, is_webhook_enabled, get_webhook_url
+from ai.vision_llm import (
+    analyze_smart_security, analyze_combined, analyze_mosaic,
+    get_preprocess_cache_stats, get_result_cache_stats,
+)
+from ai.inference_scheduler import ALERT_RECHECK, ROUTINE
+from vision.mosaic import build_mosaic
+from settings import (
+    get_max_screenshots, get_pipeline_queue_size, get_stage_config, is_evs_enabled, get_evs_config, get_monitor_analyzer,
+    is_mosaic_enabled, get_mosaic_config, get_alert_dedup_config,
+)
+from vision.evs_logic import evs_manager
+from automation.pipeline import Pipeline, Stage
+from automation.alert_rules import classify, summarize
+from automation.alert_hub import alert_hub, alert_to_event
+from automation.notifier import notifier
+from automation.alert_dedup import alert_dedup
+from ai.result_cache import dhash
 
 from database import SessionLocal
 from models import Camera, Alert
@@ -17,7 +32,229 @@ CACHE_FOLDER = "cache"
 if not os.path.exists(CACHE_FOLDER):
     os.makedirs(CACHE_FOLDER)
 
+# ── Pipeline state (reported through /automation/status) ─────────────────────
+
+_active_pipeline: Pipeline | None = None
+_last_cycle: dict = {}
+
+
+def get_pipeline_status() -> dict:
+    """Queue depths of the running cycle plus stats of the last completed one."""
+    return {
+        "cycle_in_progress": _active_pipeline is not None,
+        "queue_depth": _active_pipeline.queue_depths() if _active_pipeline else None,
+        "last_cycle": _last_cycle or None,
+        "evs": evs_manager.get_stats(),
+        "preprocess_cache": get_preprocess_cache_stats(),
+        "vlm_result_cache": get_result_cache_stats(),
+    }
+
+
+# ── Pipeline stages ─────────────────────────────────────────────────────────
+# Each job is a dict that accumulates fields as it moves through the stages:
+#   capture → {"camera", "frame"} → gate → [mosaic] → analyze → {"result", "analysis"} → alert
+# "frame" is the in-memory JPEG; it only hits disk if it becomes alert evidence.
+
+def _capture_timeout() -> float | None:
+    stage_timeout = get_stage_config("capture")["timeout_seconds"]
+    return max(1.0, stage_timeout - 2.0) if stage_timeout else None
+
+
+async def _capture_stage(job: dict) -> dict | None:
+    camera = job["camera"]
+    print(f"[Automation] Processing camera: {camera.name} ({camera.id})")
+
+    # --- Primary: Capture frame from RTSP stream (thread or decode worker — never blocks the event loop) ---
+    try:
+        # OpenCV gets the stage timeout (less a margin), so a dead stream ends its
+        # capture thread instead of lingering after the pipeline gave up on it
+        frame = await capture_jpeg_async(camera.streamUrl, timeout=_capture_timeout())
+    except Exception as e:
+        print(f"[Automation] Capture thread error: {e}")
+        frame = None
+
+    # --- Fallback: Use latest dashboard snapshot if RTSP failed ---
+    if not frame:
+        print(f"[Automation] RTSP capture failed for {camera.name} — checking for dashboard snapshot...")
+        snapshot_path = get_latest_dashboard_snapshot(str(camera.id))
+        if snapshot_path:
+            print(f"[Automation] Using dashboard snapshot for VLM: {snapshot_path}")
+            with open(snapshot_path, "rb") as f:
+                frame = f.read()
+        else:
+            print(f"[Automation] No snapshot available for {camera.name}, skipping.")
+            return None
+
+    job["frame"] = frame
+    return job
+
+
+async def _gate_stage(job: dict) -> dict | None:
+    if not is_evs_enabled():
+        return job
+
+    # EVS: only frames with significant change (or past max_idle_seconds) reach the VLM
+    camera = job["camera"]
+    camera_id = str(camera.id)
+    analyze = await asyncio.to_thread(
+        evs_manager.should_analyze, camera_id, job["frame"], **get_evs_config(camera_id)
+    )
+    if not analyze:
+        print(f"[Automation] EVS: no significant change on {camera.name}, VLM skipped.")
+        return None
+    return job
+
+
+class _MosaicBatcher:
+    """
+    Mosaic stage: buffers gated frames per Place and screens each full group
+    of `tiles` cameras with ONE inference on a labelled grid image.
+    Cleared tiles skip the analyze stage; suspicious ones continue to it for
+    a full-resolution re-check at ALERT_RECHECK priority.
+    A screen that fails or exceeds `timeout` passes its whole group on
+    unscreened, so every camera still gets its own analysis.
+    """
+    def __init__(self, tiles: int, tile_size: tuple[int, int], timeout: float | None = None):
+        self.tiles = max(2, int(tiles))
+        self.tile_size = tuple(tile_size)
+        self.timeout = timeout
+        self._buffers: dict[str, list] = {}
+        self.stats = {"mosaics": 0, "tiles": 0, "cleared": 0, "rechecks": 0, "failed": 0}
+
+    async def handle(self, job: dict) -> list:
+        place = job["camera"].placeId or "_unassigned"
+        buffer = self._buffers.setdefault(place, [])
+        buffer.append(job)
+        if len(buffer) < self.tiles:
+            return []  # held until the group is full (or flushed at end of cycle)
+        del self._buffers[place]
+        return await self._screen(buffer)
+
+    async def flush(self) -> list:
+        out = []
+        for place, group in list(self._buffers.items()):
+            del self._buffers[place]
+            # A lone frame goes straight to the regular analyzer
+            out.extend(group if len(group) == 1 else await self._screen(group))
+        return out
+
+    async def _screen(self, group: list) -> list:
+        try:
+            if self.timeout:
+                labels, findings = await asyncio.wait_for(self._sweep(group), self.timeout)
+            else:
+                labels, findings = await self._sweep(group)
+        except asyncio.TimeoutError:
+            self.stats["failed"] += 1
+            print(f"[Automation] Mosaic sweep of {len(group)} cameras timed out after {self.timeout}s — analyzing individually")
+            return group
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[Automation] Mosaic sweep of {len(group)} cameras failed ({e}) — analyzing individually")
+            return group
+        self.stats["mosaics"] += 1
+        self.stats["tiles"] += len(group)
+
+        for job, label in zip(group, labels):
+            tile = findings[label]
+            if tile.suspicious or classify(tile.finding):
+                job["priority"] = ALERT_RECHECK
+                self.stats["rechecks"] += 1
+                print(f"[Automation] Mosaic tile {label} ({job['camera'].name}) flagged: {tile.finding} — re-checking")
+            else:
+                job["result"] = f"STATUS: NORMAL. Observation: {tile.finding} (mosaic sweep)"
+                self.stats["cleared"] += 1
+        return group
+
+    async def _sweep(self, group: list):
+        mosaic, labels = await asyncio.to_thread(build_mosaic, [j["frame"] for j in group], self.tile_size)
+        findings = await analyze_mosaic(mosaic, labels)
+        return labels, findings
+
+
+async def _analyze_stage(job: dict) -> dict | None:
+    camera = job["camera"]
+
+    # Already cleared by a mosaic sweep — nothing to re-analyze
+    if "result" in job:
+        return job
+
+    priority = job.get("priority", ROUTINE)
+    if get_monitor_analyzer() == "combined":
+        # Security + PPE/fire/machinery findings from ONE structured inference
+        analysis = await analyze_combined(job["frame"], camera_id=str(camera.id), priority=priority)
+        job["analysis"] = analysis
+        result = analysis.to_message()
+        cache_age = analysis.cache_age if analysis.cached else None
+    else:
+        # Analyze for alerts using advanced Smart Security VLM
+        result = await analyze_smart_security(job["frame"], camera_id=str(camera.id), priority=priority)
+        cache_age = getattr(result, "cache_age", None) if getattr(result, "cached", False) else None
+
+    # Verdict reused from an earlier near-identical frame (VLM result cache)
+    reused = f" [cached, {cache_age:.0f}s old]" if cache_age is not None else ""
+    print(f"[Automation] VLM Result for {camera.name}{reused}: {result}")
+
+    # Skip alert processing for invalid/garbage VLM output
+    if "SKIPPED" in result.upper():
+        return None
+
+    job["result"] = str(result)
+    if cache_age is not None:
+        job["cache_age"] = cache_age
+    return job
+
+
+def _alert_stage(db):
+    async def handler(job: dict) -> dict | None:
+        result = job["result"]
+        camera = job["camera"]
+        if "cache_age" in job:
+            # Keep it visible on the alert that no fresh inference saw this frame
+            result = f"{result} [verdict reused from a near-identical frame {job['cache_age']:.0f}s earlier]"
+
+        analysis = job.get("analysis")
+        if analysis is not None:
+            # Structured analyzer decides; rules only categorize its findings
+            # (its NORMAL text may well say "no fire or smoke visible")
+            if analysis.is_alert:
+                matches = classify(", ".join(analysis.findings))
+                await handle_alert(db, camera, result, matches=matches, frame=job["frame"])
+            return job
+
+        # Free-text analyzers: the compiled rule set decides
+        matches = classify(job["result"])
+        if matches:
+            await handle_alert(db, camera, result, matches=matches, frame=job["frame"])
+        return job
+    return handler
+
+
+def _build_pipeline(db, mosaic: _MosaicBatcher | None = None) -> Pipeline:
+    handlers = [
+        ("capture", _capture_stage, None),
+        ("gate", _gate_stage, None),
+        ("analyze", _analyze_stage, None),
+        ("alert", _alert_stage(db), None),
+    ]
+    if mosaic:
+        handlers.insert(2, ("mosaic", mosaic.handle, mosaic.flush))
+
+    stages = []
+    for name, handler, flush in handlers:
+        cfg = get_stage_config(name)
+        timeout = cfg["timeout_seconds"]
+        if name == "mosaic":
+            # The batcher times each sweep itself: a group has already left its
+            # buffer, so a stage-level cancel would drop every camera in it
+            mosaic.timeout = timeout
+            timeout = None
+        stages.append(Stage(name, handler, cfg["concurrency"], timeout, flush=flush))
+    return Pipeline(stages, queue_size=get_pipeline_queue_size())
+
+
 async def run_monitoring():
+    global _active_pipeline, _last_cycle
     print("[Automation] Starting monitoring cycle...")
     
     db = SessionLocal()
@@ -27,93 +264,99 @@ async def run_monitoring():
             print("[Automation] No cameras found in database.")
             return
 
-        for camera in cameras:
-            if not camera.streamUrl:
-                continue
-
+        jobs = [
+            {"camera": camera}
+            for camera in cameras
+            if camera.streamUrl
             # Skip offline cameras — avoids wasting time on 300+ unreachable VMS streams
-            if camera.status and camera.status.lower() == "offline":
-                continue
+            and not (camera.status and camera.status.lower() == "offline")
+        ]
 
-            print(f"[Automation] Processing camera: {camera.name} ({camera.id})")
-            
-            # Generate unique filename for this screenshot
-            filename = f"{camera.id}_{uuid.uuid4().hex}.jpg"
-            image_path = os.path.join(CACHE_FOLDER, filename)
+        mosaic = _MosaicBatcher(*get_mosaic_config()) if is_mosaic_enabled() else None
+        pipeline = _build_pipeline(db, mosaic)
+        _active_pipeline = pipeline
+        try:
+            duration = await pipeline.run(jobs)
+        finally:
+            _active_pipeline = None
 
-            # --- Primary: Capture frame from RTSP stream (in a thread to prevent blocking event loop) ---
-            try:
-                # Add a timeout so bad streams don't hang the thread indefinitely (5 seconds = 5000000 us)
-                os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "timeout;5000000|rtsp_transport;tcp"
-                captured_path = await asyncio.to_thread(capture_frame, camera.streamUrl, save_path=image_path)
-            except Exception as e:
-                print(f"[Automation] Capture thread error: {e}")
-                captured_path = None
-
-            # --- Fallback: Use latest dashboard snapshot if RTSP failed ---
-            if not captured_path:
-                print(f"[Automation] RTSP capture failed for {camera.name} — checking for dashboard snapshot...")
-                captured_path = get_latest_dashboard_snapshot(str(camera.id))
-                if captured_path:
-                    print(f"[Automation] Using dashboard snapshot for VLM: {captured_path}")
-                else:
-                    print(f"[Automation] No snapshot available for {camera.name}, skipping.")
-                    continue
-
-            # Analyze for alerts using advanced Smart Security VLM
-            result = await analyze_smart_security(captured_path)
-            print(f"[Automation] VLM Result for {camera.name}: {result}")
-
-            # Skip alert processing for invalid/garbage VLM output
-            if "SKIPPED" in result.upper():
-                continue
-
-            # Check for alert triggers using dynamic keywords
-            keywords = get_alert_keywords()
-            if "ALERT DETECTED" in result.upper() or any(k.lower() in result.lower() for k in keywords):
-                await handle_alert(db, camera, result, captured_path)
+        _last_cycle = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_seconds": round(duration, 2),
+            "cameras": len(jobs),
+            "queue_depth": pipeline.queue_depths(),
+            "stages": pipeline.stage_stats(),
+            "mosaic": mosaic.stats if mosaic else None,
+            "cached_verdicts": sum("cache_age" in job for job in jobs),
+        }
+        print(f"[Automation] Cycle finished: {len(jobs)} cameras in {duration:.1f}s")
             
     finally:
         db.close()
 
     cleanup_cache()
 
-async def handle_alert(db, camera, message, image_path):
+async def handle_alert(db, camera, message, image_path=None, matches=None, frame=None):
     """
     Persists the alert and triggers notifications.
+    Severity and categories come from the alert rules matched in the message.
+    A repeat of an open alert only bumps its occurrence count (see alert_dedup).
+    `frame` (JPEG bytes) is saved as evidence for new alerts when no image_path is given.
     """
-    print(f"\n!!! ALERT DETECTED on {camera.name} !!!")
+    if matches is None:
+        matches = classify(message)
+    if matches:
+        severity, category, categories = summarize(matches)
+    else:
+        # Structured analyzer flagged it without any rule phrase in the text
+        severity, category, categories = "warning", "vlm_alert", ["vlm_alert"]
+
+    # 1. Repeat of an open alert? Update it — no new row, evidence file or notification
+    dedup = get_alert_dedup_config()
+    phash = None
+    if dedup["enabled"]:
+        if frame is not None:
+            try:
+                phash = await asyncio.to_thread(dhash, frame)
+            except Exception:
+                phash = None
+        repeat = alert_dedup.find_repeat(db, camera.id, category, message, phash, dedup)
+        if repeat is not None:
+            alert_dedup.record_repeat(db, repeat, message, phash)
+            print(f"[Automation] Repeat of alert on {camera.name} [{category}] ×{repeat.occurrences} — suppressed")
+            alert_hub.publish(alert_to_event(repeat))
+            return repeat
+
+    print(f"\n!!! ALERT DETECTED on {camera.name} [{severity}: {', '.join(categories)}] !!!")
     print(f"Details: {message}\n")
 
-    # 1. Persist to Database
+    if image_path is None and frame is not None:
+        # The frame becomes evidence — this is the only disk write on the monitoring path
+        image_path = os.path.join(CACHE_FOLDER, f"{camera.id}_{uuid.uuid4().hex}.jpg")
+        await asyncio.to_thread(save_jpeg, frame, image_path)
+
+    # 2. Persist to Database
     new_alert = Alert(
         cameraId=camera.id,
         cameraName=camera.name,
         message=message,
-        severity="critical" if "fire" in message.lower() or "smoke" in message.lower() else "warning",
+        severity=severity,
+        category=category,
+        categories=categories,
         imagePath=image_path
     )
     db.add(new_alert)
     db.commit()
+    alert_dedup.record_new(new_alert, phash)
 
-    # 2. Webhook Notification (dynamic settings)
-    if is_webhook_enabled() and get_webhook_url():
-        await send_webhook(camera.name, message)
+    # 3. Push to open dashboards (non-blocking, per-client bounded buffers)
+    event = alert_to_event(new_alert)
+    alert_hub.publish(event)
+
+    # 4. Webhook / email — queued to the background dispatcher, never awaited here
+    notifier.enqueue(event["data"])
+    return new_alert
 
-async def send_webhook(camera_name, message):
-    """
-    Sends a generic webhook notification.
-    """
-    try:
-        async with httpx.AsyncClient() as client:
-            payload = {
-                "content": f"🚨 **Security Alert** 🚨\n**Camera:** {camera_name}\n**Details:** {message}"
-            }
-            response = await client.post(get_webhook_url(), json=payload)
-            if response.status_code >= 400:
-                print(f"[Webhook] Error: {response.status_code}")
-    except Exception as e:
-        print(f"[Webhook] Failed to send: {e}")
 
 def cleanup_cache():
     """
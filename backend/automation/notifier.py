@@ -0,0 +1,191 @@
+"""
+Background alert notification dispatcher.
+
+handle_alert() only enqueues; a single dispatcher task delivers to the
+enabled channels (webhook, email) so a slow or unreachable endpoint never
+holds up a monitoring cycle.
+
+- Coalescing: alerts arriving within `batch_window_seconds` (up to
+  `max_batch`) go out as ONE digest message per channel
+- Retries: each failed send is retried with exponential backoff
+  (backoff_seconds × 2^attempt, capped, with jitter) up to `max_retries`
+- At most `max_in_flight` sends run at once; retries wait in their own task,
+  so the next batch is not blocked behind them
+- Sends that exhaust their retries are kept (last 50) for the status API
+"""
+import asyncio
+import os
+import random
+import smtplib
+import time
+from collections import deque
+from email.message import EmailMessage
+
+from http_clients import get_client, record_error
+from settings import (
+    is_webhook_enabled, get_webhook_url, is_email_enabled, get_email_config, get_notification_config,
+)
+
+QUEUE_SIZE = 1000
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+
+
+# ── Message formatting ──────────────────────────────────────────────────────
+
+def _format_webhook(alerts: list[dict]) -> dict:
+    if len(alerts) == 1:
+        a = alerts[0]
+        return {"content": f"🚨 **Security Alert** 🚨\n**Camera:** {a['cameraName']}\n**Details:** {a['message']}"}
+    lines = [f"🚨 **{len(alerts)} Security Alerts** 🚨"]
+    lines += [f"• **{a['cameraName']}** [{a.get('severity', 'warning')}]: {a['message'][:200]}" for a in alerts]
+    return {"content": "\n".join(lines)[:1900]}
+
+
+def _format_email(alerts: list[dict], config: dict) -> EmailMessage:
+    msg = EmailMessage()
+    critical = any(a.get("severity") == "critical" for a in alerts)
+    if len(alerts) == 1:
+        subject = f"[SmartCamera] {'CRITICAL ' if critical else ''}Alert on {alerts[0]['cameraName']}"
+    else:
+        subject = f"[SmartCamera] {len(alerts)} alerts{' (critical)' if critical else ''}"
+    msg["Subject"] = subject
+    msg["From"] = config["from"]
+    msg["To"] = ", ".join(config["to"])
+    msg.set_content("\n\n".join(
+        f"Camera: {a['cameraName']}\nSeverity: {a.get('severity', 'warning')}\n"
+        f"Time: {a.get('timestamp') or ''}\nDetails: {a['message']}"
+        for a in alerts
+    ))
+    return msg
+
+
+# ── Channels ────────────────────────────────────────────────────────────────
+
+async def _send_webhook(alerts: list[dict]):
+    try:
+        response = await get_client("webhook").post(get_webhook_url(), json=_format_webhook(alerts))
+    except Exception:
+        record_error("webhook")
+        raise
+    response.raise_for_status()
+
+
+def _smtp_send(msg: EmailMessage, config: dict):
+    with smtplib.SMTP(config["smtp_host"], int(config["smtp_port"]), timeout=15) as smtp:
+        if config.get("starttls"):
+            smtp.starttls()
+        if config.get("username"):
+            smtp.login(config["username"], SMTP_PASSWORD)
+        smtp.send_message(msg)
+
+
+async def _send_email(alerts: list[dict]):
+    config = get_email_config()
+    await asyncio.to_thread(_smtp_send, _format_email(alerts, config), config)
+
+
+def _enabled_channels() -> dict:
+    channels = {}
+    if is_webhook_enabled() and get_webhook_url():
+        channels["webhook"] = _send_webhook
+    if is_email_enabled() and get_email_config().get("to"):
+        channels["email"] = _send_email
+    return channels
+
+
+# ── Dispatcher ──────────────────────────────────────────────────────────────
+
+class NotificationDispatcher:
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._sends: set[asyncio.Task] = set()
+        self._in_flight: asyncio.Semaphore | None = None
+        self.failed: deque = deque(maxlen=50)
+        self.stats = {"queued": 0, "dropped": 0, "batches": 0, "sent": 0, "retries": 0, "failures": 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._in_flight = asyncio.Semaphore(get_notification_config()["max_in_flight"])
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_seconds: float = 5.0):
+        """Stop batching; give in-progress sends a moment to finish."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._sends:
+            await asyncio.wait(self._sends, timeout=drain_seconds)
+            for task in self._sends:
+                task.cancel()
+        self._task = None
+
+    def enqueue(self, alert: dict):
+        """Non-blocking; called from handle_alert."""
+        if not _enabled_channels():
+            return
+        self.start()
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.stats["dropped"] += 1
+        self._queue.put_nowait(alert)
+        self.stats["queued"] += 1
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            config = get_notification_config()
+
+            # Coalesce the burst: collect until the window closes or the batch is full
+            deadline = time.monotonic() + config["batch_window_seconds"]
+            while len(batch) < config["max_batch"]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats["batches"] += 1
+            for name, send in _enabled_channels().items():
+                task = asyncio.create_task(self._deliver(name, send, batch, config))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+
+    async def _deliver(self, channel: str, send, batch: list[dict], config: dict):
+        for attempt in range(config["max_retries"] + 1):
+            try:
+                async with self._in_flight:
+                    await send(batch)
+                self.stats["sent"] += 1
+                print(f"[Notify] {channel}: sent {len(batch)} alert(s)")
+                return
+            except Exception as e:
+                if attempt == config["max_retries"]:
+                    self.stats["failures"] += 1
+                    self.failed.append({"channel": channel, "alerts": len(batch), "error": str(e), "at": time.time()})
+                    print(f"[Notify] {channel}: giving up after {attempt + 1} attempts — {e}")
+                    return
+                delay = min(config["max_backoff_seconds"], config["backoff_seconds"] * 2 ** attempt)
+                delay *= random.uniform(0.8, 1.2)
+                self.stats["retries"] += 1
+                print(f"[Notify] {channel}: send failed ({e}) — retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "sending": len(self._sends),
+            "channels": list(_enabled_channels()),
+            "recent_failures": list(self.failed)[-5:],
+        }
+
+
+notifier = NotificationDispatcher()
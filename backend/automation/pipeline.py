@@ -0,0 +1,173 @@
+"""
+Staged producer/consumer pipeline for the monitoring cycle.
+
+Each Stage runs `concurrency` workers that pull items from a bounded
+asyncio.Queue, apply the stage handler under a per-item timeout and push
+the result onto the next stage's queue:
+
+    feeder → [capture] → [gate] → [analyze] → [alert]
+
+- A handler returning None drops the item (e.g. capture failed, gate said skip)
+- A handler returning a list fans out into several downstream items; an
+  empty list means the item was consumed (e.g. buffered for batching)
+- Bounded queues apply back-pressure so a slow VLM stage never lets
+  hundreds of captured frames pile up in memory
+"""
+import asyncio
+import time
+
+
+_DONE = object()  # End-of-stream marker, one per downstream worker
+
+
+class Stage:
+    def __init__(self, name: str, handler, concurrency: int = 1, timeout: float | None = None, flush=None):
+        self.name = name
+        self.handler = handler            # async def handler(item) -> item | list | None
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout            # seconds per item (None = no limit)
+        self.flush = flush                # optional async def flush() -> list, run once upstream is drained
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "concurrency": self.concurrency,
+            "timeout_seconds": self.timeout,
+            "processed": 0,
+            "dropped": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "busy_seconds": 0.0,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages: list, queue_size: int = 32):
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self._queues: list[asyncio.Queue] = []
+        self._max_depth: list[int] = []
+
+    # ── Introspection (for /automation/status) ──────────────────────────────
+
+    def queue_depths(self) -> dict:
+        """Current and peak depth of each stage's input queue."""
+        return {
+            stage.name: {
+                "current": q.qsize(),
+                "peak": peak,
+                "capacity": self.queue_size,
+            }
+            for stage, q, peak in zip(self.stages, self._queues, self._max_depth)
+        }
+
+    def stage_stats(self) -> dict:
+        return {
+            stage.name: {**stage.stats, "busy_seconds": round(stage.stats["busy_seconds"], 2)}
+            for stage in self.stages
+        }
+
+    # ── Execution ───────────────────────────────────────────────────────────
+
+    async def run(self, items) -> float:
+        """Push every item through all stages. Returns cycle duration in seconds."""
+        started = time.monotonic()
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._max_depth = [0 for _ in self.stages]
+        for stage in self.stages:
+            stage.reset_stats()
+
+        workers = []
+        for index, stage in enumerate(self.stages):
+            workers.append([
+                asyncio.create_task(self._worker(index))
+                for _ in range(stage.concurrency)
+            ])
+
+        try:
+            for item in items:
+                await self._put(0, item)
+            await self._close(0)
+
+            for index, stage in enumerate(self.stages):
+                await asyncio.gather(*workers[index])
+                if stage.flush:
+                    for out in await self._flush(stage):
+                        await self._emit(index, out)
+                if index + 1 < len(self.stages):
+                    await self._close(index + 1)
+        finally:
+            for group in workers:
+                for task in group:
+                    if not task.done():
+                        task.cancel()
+
+        return time.monotonic() - started
+
+    async def _put(self, index: int, item):
+        await self._queues[index].put(item)
+        depth = self._queues[index].qsize()
+        if depth > self._max_depth[index]:
+            self._max_depth[index] = depth
+
+    async def _close(self, index: int):
+        for _ in range(self.stages[index].concurrency):
+            await self._queues[index].put(_DONE)
+
+    async def _emit(self, index: int, result):
+        """Forward a handler result to the next stage (if any)."""
+        if index + 1 >= len(self.stages):
+            return
+        outputs = result if isinstance(result, list) else [result]
+        for out in outputs:
+            await self._put(index + 1, out)
+
+    async def _flush(self, stage: Stage) -> list:
+        """Run a stage's end-of-cycle flush under the same timeout/error handling as its handler."""
+        started = time.monotonic()
+        try:
+            if stage.timeout:
+                return await asyncio.wait_for(stage.flush(), stage.timeout) or []
+            return await stage.flush() or []
+        except asyncio.TimeoutError:
+            stage.stats["timeouts"] += 1
+            print(f"[Pipeline] {stage.name} flush timed out after {stage.timeout}s")
+        except Exception as e:
+            stage.stats["errors"] += 1
+            print(f"[Pipeline] {stage.name} flush error: {e}")
+        finally:
+            stage.stats["busy_seconds"] += time.monotonic() - started
+        return []
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        queue = self._queues[index]
+
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+
+            started = time.monotonic()
+            try:
+                if stage.timeout:
+                    result = await asyncio.wait_for(stage.handler(item), stage.timeout)
+                else:
+                    result = await stage.handler(item)
+            except asyncio.TimeoutError:
+                stage.stats["timeouts"] += 1
+                print(f"[Pipeline] {stage.name} timed out after {stage.timeout}s")
+                result = None
+            except Exception as e:
+                stage.stats["errors"] += 1
+                print(f"[Pipeline] {stage.name} error: {e}")
+                result = None
+            finally:
+                stage.stats["busy_seconds"] += time.monotonic() - started
+
+            if result is None:
+                stage.stats["dropped"] += 1
+                continue
+
+            stage.stats["processed"] += 1
+            await self._emit(index, result)
@@ -9,8 +9,16 @@ import asyncio
 import logging
 from datetime import datetime, timezone
 
-from automation.monitor import run_monitoring
-from settings import get_interval, is_automation_enabled
+from automation.monitor import run_monitoring, get_pipeline_status
+from settings import get_interval, is_automation_enabled, refresh as refresh_settings
+from vision.stream_grabber import grabber_pool
+from vision.decode_pool import decode_pool
+from ai.inference_scheduler import inference_scheduler, command_scheduler
+from automation.alert_hub import alert_hub
+from ai.ollama_client import get_ollama_status
+from automation.notifier import notifier
+from automation.alert_dedup import alert_dedup
+from logic.command_parser import get_command_cache_stats
 
 # ── State ───────────────────────────────────────────────────────────────────
 
@@ -28,6 +36,16 @@ def get_status() -> dict:
         "last_run_time": last_run_time,
         "next_run_time": next_run_time,
         "interval_seconds": get_interval(),
+        "pipeline": get_pipeline_status(),
+        "stream_grabbers": grabber_pool.stats(),
+        "decode_pool": decode_pool.stats(),
+        "inference": inference_scheduler.stats(),
+        "command_inference": command_scheduler.stats(),
+        "command_cache": get_command_cache_stats(),
+        "alert_stream": alert_hub.stats(),
+        "ollama": get_ollama_status(),
+        "notifications": notifier.get_stats(),
+        "alert_dedup": alert_dedup.stats(),
     }
 
 
@@ -41,7 +59,9 @@ async def _scheduler_loop():
     print(f"[Scheduler] Starting automation loop (Interval: {interval}s)")
 
     while is_running:
-        # Re-read interval each tick so UI changes take effect immediately
+        # Pick up hand edits of automation_config.json (one stat per tick, not per camera),
+        # then re-read interval so UI changes take effect immediately
+        refresh_settings()
         interval = get_interval()
 
         # Check if automation is enabled in settings
@@ -1,13 +1,35 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///./cctv.db"
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False, "timeout": 15}
 )
 
+
+# ── SQLite performance profile ───────────────────────────────────────────
+# WAL lets API reads run while the monitor commits alerts; NORMAL sync is
+# durable across app crashes under WAL and avoids an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,        # ms to wait on a locked database instead of failing
+    "cache_size": -16000,        # ~16 MB page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 134217728,      # 128 MB memory-mapped reads
+}
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(bind=engine)
 
 Base = declarative_base()
@@ -19,3 +41,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ensure_schema():
+    """
+    Creates missing tables and applies pending schema migrations
+    (see migrations.py). Safe to call on every startup.
+    """
+    import models  # noqa: F401 — registers the tables on Base
+    from migrations import migrate
+
+    Base.metadata.create_all(bind=engine)
+    migrate(engine)
@@ -0,0 +1,129 @@
+"""
+Application-scoped outbound HTTP clients.
+
+Deepgram, alert webhooks and the VMS each get ONE long-lived httpx.AsyncClient
+(created at startup, closed at shutdown) instead of a fresh client — and a
+fresh TCP+TLS handshake — per call. Each target has its own connection limits,
+keep-alive expiry and timeouts; HTTP/2 (the `h2` package, in requirements.txt)
+is negotiated when the server offers it.
+
+Event hooks count requests, responses by status class and HTTP version, errors
+and latency per target; together with the pool's open/idle connections (when
+httpx exposes them) they are served by GET /http/stats.
+"""
+import importlib.util
+import time
+
+import httpx
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+TARGETS = {
+    "deepgram": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=4, keepalive_expiry=120),
+    },
+    "webhook": {
+        "timeout": httpx.Timeout(10.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=8, max_keepalive_connections=2, keepalive_expiry=60),
+    },
+    "vms": {
+        # Holds the VMS login cookies; see vms_sync
+        "timeout": httpx.Timeout(30.0, connect=10.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=4, keepalive_expiry=300),
+        "verify": False,
+        "follow_redirects": True,
+    },
+}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_metrics: dict[str, dict] = {}
+
+
+def _new_metrics() -> dict:
+    return {"requests": 0, "in_flight": 0, "errors": 0, "responses": {}, "http_versions": {},
+            "latency_total": 0.0, "latency_max": 0.0}
+
+
+def _hooks(name: str) -> dict:
+    metrics = _metrics.setdefault(name, _new_metrics())
+
+    async def on_request(request: httpx.Request):
+        metrics["requests"] += 1
+        metrics["in_flight"] += 1
+        request.extensions["started"] = time.monotonic()
+
+    async def on_response(response: httpx.Response):
+        started = response.request.extensions.get("started")
+        metrics["in_flight"] = max(0, metrics["in_flight"] - 1)
+        if started is not None:
+            elapsed = time.monotonic() - started
+            metrics["latency_total"] += elapsed
+            metrics["latency_max"] = max(metrics["latency_max"], elapsed)
+        status_class = f"{response.status_code // 100}xx"
+        metrics["responses"][status_class] = metrics["responses"].get(status_class, 0) + 1
+        version = response.http_version
+        metrics["http_versions"][version] = metrics["http_versions"].get(version, 0) + 1
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """The shared client for a target (created on first use if startup hasn't run)."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, event_hooks=_hooks(name), **TARGETS[name])
+        _clients[name] = client
+    return client
+
+
+def record_error(name: str):
+    """Transport failures never reach the response hook — callers report them here."""
+    metrics = _metrics.setdefault(name, _new_metrics())
+    metrics["errors"] += 1
+    metrics["in_flight"] = max(0, metrics["in_flight"] - 1)
+
+
+def start_http_clients():
+    for name in TARGETS:
+        get_client(name)
+    print(f"[HTTP] Clients ready: {', '.join(TARGETS)} (HTTP/2 {'on' if HTTP2_AVAILABLE else 'off — h2 not installed'})")
+
+
+async def close_http_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def _pool_stats(client: httpx.AsyncClient) -> dict:
+    # httpx doesn't expose its pool; read it best-effort from the default
+    # transport and report nothing if a different httpx/httpcore lays it out otherwise
+    try:
+        connections = list(client._transport._pool.connections)
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+    except Exception:
+        return {}
+
+
+def get_http_stats() -> dict:
+    stats = {}
+    for name, config in TARGETS.items():
+        m = _metrics.get(name, _new_metrics())
+        done = sum(m["responses"].values())
+        client = _clients.get(name)
+        stats[name] = {
+            "requests": m["requests"],
+            "in_flight": m["in_flight"],
+            "errors": m["errors"],
+            "responses": dict(m["responses"]),
+            "http_versions": dict(m["http_versions"]),
+            "avg_latency_seconds": round(m["latency_total"] / done, 3) if done else 0.0,
+            "max_latency_seconds": round(m["latency_max"], 3),
+            "max_connections": config["limits"].max_connections,
+            **(_pool_stats(client) if client and not client.is_closed else {}),
+        }
+    return {"http2": HTTP2_AVAILABLE, "targets": stats}
@@ -1,6 +1,5 @@
-from database import engine
-from models import Base
+from database import ensure_schema
 
-Base.metadata.create_all(bind=engine)
+ensure_schema()
 
 print("Database created")
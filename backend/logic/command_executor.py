@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from models import Place, Camera
 from vision.vision_executor import process_vision
 from logic.context_manager import set_last_camera, get_last_camera
+from logic.name_index import find_camera, find_place, invalidate_names
 
 
 async def execute_command(command: dict, db: Session):
@@ -41,31 +42,9 @@ async def execute_command(command: dict, db: Session):
                         "cameras": [serialize_camera(c) for c in all_cameras]
                     }
 
-            # Try finding by name first (full partial match)
+            # Fuzzy name match (tolerates ASR typos and extra spoken words)
             if not camera and camera_name:
-                camera = db.query(Camera).filter(
-                    Camera.name.ilike(f"%{camera_name}%")
-                ).first()
-
-                # Try progressively smaller substrings (n-gram approach)
-                # This prioritises longer matches: "sri lakshmi narayan" before "sri lakshmi"
-                if not camera:
-                    words = camera_name.split()
-                    matched = None
-                    best_len = 0
-                    # Try all contiguous substrings, longest first
-                    for length in range(len(words), 0, -1):
-                        for start in range(len(words) - length + 1):
-                            phrase = " ".join(words[start:start + length])
-                            result = db.query(Camera).filter(
-                                Camera.name.ilike(f"%{phrase}%")
-                            ).first()
-                            if result and length > best_len:
-                                matched = result
-                                best_len = length
-                        if matched:
-                            break  # Stop at longest match found
-                    camera = matched
+                camera = find_camera(db, camera_name)
 
             # Fall back to ID match
             if not camera and camera_id:
@@ -90,9 +69,7 @@ async def execute_command(command: dict, db: Session):
 
             place_name = command.get("place_name")
 
-            place = db.query(Place).filter(
-                Place.name.ilike(f"%{place_name}%")
-            ).first()
+            place = find_place(db, place_name) if place_name else None
 
             if not place:
                 return {
@@ -126,6 +103,7 @@ async def execute_command(command: dict, db: Session):
             db.add(new_place)
             db.commit()
             db.refresh(new_place)
+            invalidate_names()
 
             return {
                 "success": True,
@@ -141,9 +119,7 @@ async def execute_command(command: dict, db: Session):
 
             place_id = None
             if place_name:
-                place = db.query(Place).filter(
-                    Place.name.ilike(f"%{place_name}%")
-                ).first()
+                place = find_place(db, place_name)
                 if place:
                     place_id = place.id
 
@@ -158,6 +134,7 @@ async def execute_command(command: dict, db: Session):
             db.add(new_camera)
             db.commit()
             db.refresh(new_camera)
+            invalidate_names()
 
             return {
                 "success": True,
@@ -185,9 +162,7 @@ async def execute_command(command: dict, db: Session):
                     "error": "Camera name not provided"
                 }
 
-            camera = db.query(Camera).filter(
-                Camera.name.ilike(f"%{camera_name}%")
-            ).first()
+            camera = find_camera(db, camera_name)
 
             if not camera:
                 return {
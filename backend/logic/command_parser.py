@@ -1,5 +1,6 @@
 import json
 import re
+from collections import OrderedDict
 
 
 # Keyword-based fallback rules: (keywords, action, extra_field)
@@ -54,87 +55,101 @@ ENTITY_WORDS_TO_SKIP = {
 }
 
 
-def _keyword_fallback(transcript: str):
-    """
-    Try to match the transcript against keyword rules.
-    Returns a command dict or None if no match.
-    """
-    words = transcript.lower().strip().rstrip(".!?").split()
-
-    for keywords, action in KEYWORD_RULES:
-        if all(kw in words for kw in keywords):
-            # Extract entity name: skip action/command words, keep name words in order
-            entity_words = [w for w in words if w not in ENTITY_WORDS_TO_SKIP]
-            entity_name = " ".join(entity_words).strip() or None
-
-            # Also try extracting name by removing only the matched keywords
-            # This preserves multi-word names like "Sri Lakshmi Narayan"
-            skip_set = ENTITY_WORDS_TO_SKIP | set(keywords)
-            full_entity_words = [w for w in words if w not in skip_set]
-            full_entity_name = " ".join(full_entity_words).strip() or None
+# ── Compiled rule index ─────────────────────────────────────────────────────
+# keyword → indices of the rules that use it; a transcript only checks the
+# rules sharing at least one of its words, and the lowest index (= the rule
+# listed first above) still wins.
+def _build_rule_index() -> dict[str, list[int]]:
+    index = {}
+    for i, (keywords, _) in enumerate(KEYWORD_RULES):
+        for kw in keywords:
+            index.setdefault(kw, []).append(i)
+    return index
 
-            # Use the longer / more complete name
-            if full_entity_name and (not entity_name or len(full_entity_name) >= len(entity_name)):
-                entity_name = full_entity_name
 
-            result = {"action": action}
+_RULE_KEYWORDS = [frozenset(keywords) for keywords, _ in KEYWORD_RULES]
+_RULE_INDEX = _build_rule_index()
 
-            if action in ("show_camera",):
-                result["camera_id"] = entity_name
-                result["camera_name"] = entity_name
-            elif action in ("show_place", "add_place"):
-                result["place_name"] = entity_name
-            elif action in ("add_camera",):
-                result["camera_name"] = entity_name
-            elif action in ("analyze_camera", "detect_person", "detect_motion",
-                            "count_objects", "describe_scene"):
-                result["camera_name"] = entity_name
+_CAMERA_ACTIONS = {"show_camera", "add_camera", "analyze_camera", "detect_person",
+                   "detect_motion", "count_objects", "describe_scene"}
+_PLACE_ACTIONS = {"show_place", "add_place"}
 
-            return result
 
-    return None
+def normalize_transcript(transcript: str) -> str:
+    """Lower-case, trailing punctuation stripped, single spaces."""
+    return " ".join(transcript.lower().strip().rstrip(".!?").split())
 
 
-def process_command(raw_output: str, transcript: str = ""):
-
+def _keyword_fallback(transcript: str):
+    """
+    Try to match the transcript against keyword rules.
+    Returns a command dict or None if no match.
+    """
+    words = normalize_transcript(transcript).split()
+    word_set = set(words)
+
+    candidates = sorted({i for w in word_set for i in _RULE_INDEX.get(w, ())})
+    rule = next((i for i in candidates if _RULE_KEYWORDS[i] <= word_set), None)
+    if rule is None:
+        return None
+    keywords, action = KEYWORD_RULES[rule]
+
+    # Extract entity name: skip action/command words, keep name words in order
+    entity_words = [w for w in words if w not in ENTITY_WORDS_TO_SKIP]
+    entity_name = " ".join(entity_words).strip() or None
+
+    # Also try extracting name by removing only the matched keywords
+    # This preserves multi-word names like "Sri Lakshmi Narayan"
+    skip_set = ENTITY_WORDS_TO_SKIP | set(keywords)
+    full_entity_words = [w for w in words if w not in skip_set]
+    full_entity_name = " ".join(full_entity_words).strip() or None
+
+    # Use the longer / more complete name
+    if full_entity_name and (not entity_name or len(full_entity_name) >= len(entity_name)):
+        entity_name = full_entity_name
+
+    result = {"action": action}
+
+    if action == "show_camera":
+        result["camera_id"] = entity_name
+        result["camera_name"] = entity_name
+    elif action in _PLACE_ACTIONS:
+        result["place_name"] = entity_name
+    elif action in _CAMERA_ACTIONS:
+        result["camera_name"] = entity_name
+
+    return result
+
+
+def _command_fields(command: dict) -> dict:
+    return {
+        "action": command.get("action", "unknown"),
+        "camera_id": command.get("camera_id"),
+        "camera_name": command.get("camera_name"),
+        "place_name": command.get("place_name"),
+        "object": command.get("object"),
+        "intent": command.get("intent")
+    }
+
+
+def process_command(raw_output: str):
+    """
+    Parses the LLM's JSON output. Only reached when the keyword rules did not
+    match the transcript (see resolve_command in main), so no fallback here.
+    """
     try:
 
         raw_output = raw_output.strip()
         raw_output = raw_output.replace("```json", "")
         raw_output = raw_output.replace("```", "")
 
-        # --- Step 1: Try keyword fallback on the original transcript FIRST ---
-        # Small LLMs like qwen2:1b are unreliable for multi-word names.
-        # Keyword fallback is faster and more accurate for common commands.
-        if transcript:
-            fallback = _keyword_fallback(transcript)
-            if fallback and fallback.get("action", "unknown") != "unknown":
-                print(f"[Parser] Keyword fallback matched: {fallback}")
-                return {
-                    "action": fallback.get("action", "unknown"),
-                    "camera_id": fallback.get("camera_id"),
-                    "camera_name": fallback.get("camera_name"),
-                    "place_name": fallback.get("place_name"),
-                    "object": fallback.get("object"),
-                    "intent": fallback.get("intent")
-                }
-
-        # --- Step 2: Parse LLM JSON output ---
         json_match = re.search(r"\{.*\}", raw_output, re.DOTALL)
 
         if json_match:
             command = json.loads(json_match.group())
 
-            action = command.get("action", "unknown")
-            if action != "unknown":
-                return {
-                    "action": action,
-                    "camera_id": command.get("camera_id"),
-                    "camera_name": command.get("camera_name"),
-                    "place_name": command.get("place_name"),
-                    "object": command.get("object"),
-                    "intent": command.get("intent")
-                }
+            if command.get("action", "unknown") != "unknown":
+                return _command_fields(command)
 
         return {
             "action": "unknown"
@@ -144,13 +159,43 @@ def process_command(raw_output: str, transcript: str = ""):
 
         print("Command parsing error:", e)
 
-        # Last resort: try keyword fallback even on parse error
-        if transcript:
-            fallback = _keyword_fallback(transcript)
-            if fallback:
-                return fallback
-
         return {
             "action": "unknown"
         }
 
+
+# ── Transcript → command cache ──────────────────────────────────────────────
+# Operators repeat the same phrases ("open sri lakshmi", "anyone at the gate");
+# the final command for a normalized transcript — including LLM slow-path
+# results — is kept so repeats skip both the rules and the LLM.
+
+COMMAND_CACHE_SIZE = 512
+
+_command_cache: OrderedDict[str, dict] = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_cached_command(transcript: str) -> dict | None:
+    key = normalize_transcript(transcript)
+    command = _command_cache.get(key)
+    if command is None:
+        _cache_stats["misses"] += 1
+        return None
+    _command_cache.move_to_end(key)
+    _cache_stats["hits"] += 1
+    return dict(command)
+
+
+def cache_command(transcript: str, command: dict):
+    # "unknown" may be a transient LLM failure — let the next attempt retry
+    if command.get("action", "unknown") == "unknown":
+        return
+    key = normalize_transcript(transcript)
+    _command_cache[key] = dict(command)
+    _command_cache.move_to_end(key)
+    while len(_command_cache) > COMMAND_CACHE_SIZE:
+        _command_cache.popitem(last=False)
+
+
+def get_command_cache_stats() -> dict:
+    return {"entries": len(_command_cache), **_cache_stats}
@@ -0,0 +1,162 @@
+"""
+In-memory fuzzy name index for cameras and places.
+
+Voice commands name cameras loosely ("show sri laxmi narayan gate camera"),
+and the old resolution ran an ILIKE full-table scan per contiguous phrase of
+the transcript. Instead, names are split into words once and indexed by word
+(postings → entries) and the vocabulary by character trigram. A lookup finds
+the vocabulary words close to each spoken word, then scores only the entries
+that contain them, so it stays sub-millisecond with thousands of cameras.
+
+Scoring (highest wins):
+  1. the whole name was spoken, or everything spoken is part of the name
+     (word-aligned, punctuation ignored) — like the old ILIKE match
+  2. otherwise, per name word: best trigram similarity to any spoken word
+     (tolerates ASR typos like "laxmi" ↔ "lakshmi"; numbers match exactly);
+     more matched words first, then the larger fraction of the name matched
+
+Indexes are rebuilt lazily after invalidate_names(), which every write path
+(API CRUD, voice add_*, VMS sync) calls.
+"""
+import re
+import threading
+
+from models import Camera, Place
+
+MIN_WORD_SIMILARITY = 0.4
+
+# Letters and digits are separate words: "Cam3" and "cam 3" normalize alike
+_WORD_RE = re.compile(r"[a-z]+|[0-9]+")
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+class NameIndex:
+    def __init__(self, rows: list[tuple[str, str]]):
+        # entries: (id, name, normalized " word word ", distinct word count)
+        self.entries = []
+        self.word_postings: dict[str, set[int]] = {}    # word → entries containing it
+        self.vocab_grams: dict[str, set[str]] = {}      # alphabetic word → its trigrams
+        self.gram_postings: dict[str, set[str]] = {}    # trigram → alphabetic words
+        for entry_id, name in rows:
+            words = _words(name)
+            if not words:
+                continue
+            idx = len(self.entries)
+            self.entries.append((entry_id, name, f" {' '.join(words)} ", len(set(words))))
+            for w in words:
+                self.word_postings.setdefault(w, set()).add(idx)
+                if w.isalpha() and w not in self.vocab_grams:
+                    self.vocab_grams[w] = grams = _trigrams(w)
+                    for g in grams:
+                        self.gram_postings.setdefault(g, set()).add(w)
+
+    def _similar_words(self, word: str) -> dict[str, float]:
+        """Vocabulary words close to a spoken word (numbers must match exactly)."""
+        found = {word: 1.0} if word in self.word_postings else {}
+        if word.isalpha():
+            grams = _trigrams(word)
+            for v in set().union(*(self.gram_postings.get(g, ()) for g in grams)):
+                sim = _similarity(grams, self.vocab_grams[v])
+                if sim >= MIN_WORD_SIMILARITY and sim > found.get(v, 0.0):
+                    found[v] = sim
+        return found
+
+    def search(self, query: str) -> tuple[str, str] | None:
+        """(id, name) of the best match for query, or None."""
+        words = _words(query)
+        if not words:
+            return None
+        phrase = f" {' '.join(words)} "
+
+        # Best similarity per vocabulary word, then accumulated per entry through the postings
+        similar: dict[str, float] = {}
+        for w in set(words):
+            for v, sim in self._similar_words(w).items():
+                if sim > similar.get(v, 0.0):
+                    similar[v] = sim
+
+        # Rare words pick the candidates; words shared by a large share of names
+        # ("cam", "mill") only add to candidates already found, unless nothing rarer matched
+        common_limit = max(64, len(self.entries) // 10)
+        matched: dict[int, float] = {}
+        named: set[int] = set()     # entries matched on at least one non-numeric word
+        for v, sim in sorted(similar.items(), key=lambda item: len(self.word_postings[item[0]])):
+            postings = self.word_postings[v]
+            if matched and len(postings) > common_limit:
+                targets = [idx for idx in matched if idx in postings]
+            else:
+                targets = postings
+            alpha = v.isalpha()
+            for idx in targets:
+                matched[idx] = matched.get(idx, 0.0) + sim
+                if alpha:
+                    named.add(idx)
+
+        # A bare number ("gate 2" → every "... 2") is not a match when words were spoken too
+        if any(w.isalpha() for w in words):
+            matched = {idx: m for idx, m in matched.items() if idx in named}
+
+        best, best_score = None, None
+        for idx, m in matched.items():
+            entry_id, name, normalized, word_count = self.entries[idx]
+            if normalized in phrase:
+                # Whole name spoken; the longest such name is the most specific
+                score = (2, len(normalized), 0.0)
+            elif phrase in normalized:
+                # Everything spoken is part of the name; prefer the shortest name
+                score = (2, -len(normalized), 0.0)
+            else:
+                score = (1, m, m / word_count)
+            if best_score is None or score > best_score:
+                best, best_score = (entry_id, name), score
+        return best
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# ── Shared indexes ───────────────────────────────────────────────────────────
+
+_indexes: dict[str, NameIndex] = {}
+_lock = threading.Lock()
+
+
+def invalidate_names():
+    """Drop the cached indexes; the next lookup rebuilds them from the database."""
+    with _lock:
+        _indexes.clear()
+
+
+def _get_index(db, model) -> NameIndex:
+    key = model.__tablename__
+    index = _indexes.get(key)
+    if index is None:
+        with _lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = NameIndex(db.query(model.id, model.name).all())
+                _indexes[key] = index
+                print(f"[NameIndex] Indexed {len(index)} {key}")
+    return index
+
+
+def find_camera(db, name: str) -> Camera | None:
+    match = _get_index(db, Camera).search(name)
+    return db.get(Camera, match[0]) if match else None
+
+
+def find_place(db, name: str) -> Place | None:
+    match = _get_index(db, Place).search(name)
+    return db.get(Place, match[0]) if match else None
@@ -1,22 +1,41 @@
 import os
+import base64
 import asyncio
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from datetime import datetime
+import json
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Query, Response, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
+from sqlalchemy import and_, or_, literal_column
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, ensure_schema
 from models import Place, Camera, Alert
 
 from ai.deepgram_stt import transcribe_audio
-from logic.command_parser import process_command, _keyword_fallback
+from ai.streaming_stt import get_streaming_stt
+from ai.llm import analyze_command, COMMAND_MODEL
+from ai.vision_llm import MODEL as VISION_MODEL
+from ai.ollama_client import start_model_keeper, stop_model_keeper
+from logic.command_parser import (
+    process_command, _keyword_fallback, _command_fields, get_cached_command, cache_command,
+)
 from logic.command_executor import execute_command
+from logic.name_index import invalidate_names
 
 from automation.scheduler import start_scheduler, stop_scheduler, toggle_scheduler, get_status as get_scheduler_status
 from automation.monitor import get_cached_screenshots
-from settings import get_settings, update_settings
+from automation.alert_hub import alert_hub
+from automation.notifier import notifier
+from settings import get_settings, update_settings, refresh as refresh_settings
 from vision.vision_executor import process_vision
 from vision.dashboard_capture import save_dashboard_snapshot
-from vms_sync import sync_vms_to_db
+from vision.stream_grabber import grabber_pool
+from vision.decode_pool import decode_pool
+from vision.camera_capture import close_capture_executor
+from http_clients import start_http_clients, close_http_clients, get_http_stats
+from vms_sync import sync_vms_to_db, start_status_sync, stop_status_sync, get_vms_sync_status
 
 app = FastAPI()
 
@@ -34,18 +53,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 #Start Scheduler in FastAPI Startup
 @app.on_event("startup")
 async def startup_event():
+    ensure_schema()
+    start_http_clients()
     asyncio.create_task(start_scheduler())
+    start_status_sync()
+    # Load both models now so the first command/analysis doesn't pay the load time
+    start_model_keeper([COMMAND_MODEL, VISION_MODEL])
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_scheduler()
+    await stop_status_sync()
+    await stop_model_keeper()
+    await notifier.stop()
+    grabber_pool.close_all()
+    decode_pool.close()
+    close_capture_executor()
+    await close_http_clients()
+
 # Health check
 @app.get("/")
 def root():
     return {"status": "CCTV Voice Agent Backend Running"}
 
 
+async def resolve_command(transcript: str, tag: str) -> dict:
+    """
+    Transcript → command: cache, then keyword rules, then the LLM.
+    Each step runs at most once per request; the result is cached for repeats.
+    """
+    command = get_cached_command(transcript)
+    if command:
+        print(f"[{tag}] Cached command: {command}")
+        return command
+
+    # ── Fast path: keyword rules (no LLM needed) ──────────────
+    fallback = _keyword_fallback(transcript)
+    if fallback and fallback.get("action", "unknown") != "unknown":
+        print(f"[{tag}] Fast path — keyword fallback: {fallback}")
+        command = _command_fields(fallback)
+    else:
+        # ── Slow path: LLM on the shared Ollama client, ahead of background inference ──
+        print(f"[{tag}] Slow path — calling LLM...")
+        llm_output = await analyze_command(transcript)
+        command = process_command(llm_output)
+
+    cache_command(transcript, command)
+    return command
+
+
 # Voice endpoint
 @app.post("/voice")
 async def voice(
@@ -65,30 +128,7 @@ async def voice(
 
     print(f"[Voice] Transcript: {transcript}")
 
-    # ── Fast path: try keyword fallback FIRST (no LLM needed) ──────────────
-    fallback = _keyword_fallback(transcript)
-    if fallback and fallback.get("action", "unknown") != "unknown":
-        print(f"[Voice] Fast path — keyword fallback: {fallback}")
-        command = {
-            "action": fallback.get("action", "unknown"),
-            "camera_id": fallback.get("camera_id"),
-            "camera_name": fallback.get("camera_name"),
-            "place_name": fallback.get("place_name"),
-            "object": fallback.get("object"),
-            "intent": fallback.get("intent"),
-        }
-    else:
-        # ── Slow path: call LLM in thread pool (non-blocking) ──────────────
-        print("[Voice] Slow path — calling LLM...")
-        loop = asyncio.get_event_loop()
-        llm_output = await loop.run_in_executor(None, lambda: __import__('ollama').chat(
-            model='qwen2:1.5b',
-            messages=[
-                {"role": "system", "content": __import__('ai.llm', fromlist=['SYSTEM_PROMPT']).SYSTEM_PROMPT},
-                {"role": "user",   "content": transcript}
-            ]
-        ).get('message', {}).get('content', '{}'))
-        command = process_command(llm_output, transcript)
+    command = await resolve_command(transcript, "Voice")
 
     execution = await execute_command(command, db)
 
@@ -99,6 +139,98 @@ async def voice(
     }
 
 
+# ── Streaming voice endpoint (audio chunks → live transcript → early intent) ──
+@app.websocket("/voice/stream")
+async def voice_stream(websocket: WebSocket, db: Session = Depends(get_db)):
+    """
+    One utterance per connection.
+    Client → binary audio chunks while recording, then the text message "stop".
+    Server → {"type": "partial", "text"} as transcription progresses,
+             {"type": "intent", "text", "command"} when a partial already parses,
+             {"type": "result", "spoken_text", "command", "execution"} at the end.
+    The utterance ends at "stop" or when the STT backend detects end of speech.
+    """
+    await websocket.accept()
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def receive_audio():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    await chunks.put(message["bytes"])
+                elif (message.get("text") or "").strip().lower() in ("stop", '{"type":"stop"}'):
+                    break
+        finally:
+            await chunks.put(None)
+
+    async def audio():
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+
+    receiver = asyncio.create_task(receive_audio())
+    transcript = ""
+    early = None  # (transcript, command) from the last partial the keyword rules matched
+    try:
+        async for event in get_streaming_stt().stream(audio()):
+            if event.text and event.text != transcript:
+                transcript = event.text
+                await websocket.send_json({"type": "partial", "text": transcript})
+
+                fallback = _keyword_fallback(transcript)
+                if fallback:
+                    command = _command_fields(fallback)
+                    if not early or early[1] != command:
+                        await websocket.send_json({"type": "intent", "text": transcript, "command": command})
+                    early = (transcript, command)
+            if event.speech_final:
+                break
+    except WebSocketDisconnect:
+        # Client hung up mid-utterance — nobody left to answer
+        print("[VoiceStream] Client disconnected during transcription")
+        return
+    except Exception as e:
+        if websocket.client_state != WebSocketState.CONNECTED:
+            print("[VoiceStream] Client disconnected during transcription")
+            return
+        print(f"[VoiceStream] STT error: {e}")
+        await _ws_finish(websocket, {"type": "error", "error": f"Transcription failed: {e}"})
+        return
+    finally:
+        receiver.cancel()
+
+    print(f"[VoiceStream] Transcript: {transcript}")
+    if not transcript:
+        await _ws_finish(websocket, {"type": "error", "error": "Could not transcribe audio"})
+        return
+
+    # The last partial already parsed to the final text → no second parse
+    if early and early[0] == transcript:
+        command = early[1]
+        cache_command(transcript, command)
+    else:
+        command = await resolve_command(transcript, "VoiceStream")
+
+    execution = await execute_command(command, db)
+    await _ws_finish(websocket, {
+        "type": "result",
+        "spoken_text": transcript,
+        "command": command,
+        "execution": execution,
+    })
+
+
+async def _ws_finish(websocket: WebSocket, message: dict):
+    """Send the last message and close — quietly if the client already left."""
+    try:
+        await websocket.send_json(message)
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        print("[VoiceStream] Client disconnected before the final message")
+
+
 # ── Text command endpoint (browser STT → text → instant response) ─────────────
 @app.post("/command")
 async def command_text(
@@ -112,35 +244,7 @@ async def command_text(
 
     print(f"[Command] Transcript: {transcript}")
 
-    # Fast path: keyword fallback (no LLM)
-    fallback = _keyword_fallback(transcript)
-    if fallback and fallback.get("action", "unknown") != "unknown":
-        print(f"[Command] Fast path — keyword fallback: {fallback}")
-        command = {
-            "action": fallback.get("action", "unknown"),
-            "camera_id": fallback.get("camera_id"),
-            "camera_name": fallback.get("camera_name"),
-            "place_name": fallback.get("place_name"),
-            "object": fallback.get("object"),
-            "intent": fallback.get("intent"),
-        }
-    else:
-        # Slow path: LLM in thread pool
-        print("[Command] Slow path — calling LLM...")
-        loop = asyncio.get_event_loop()
-        from ai.llm import SYSTEM_PROMPT
-        import ollama
-        llm_output = await loop.run_in_executor(
-            None,
-            lambda: ollama.chat(
-                model="qwen2:1.5b",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user",   "content": transcript}
-                ]
-            ).get("message", {}).get("content", "{}")
-        )
-        command = process_command(llm_output, transcript)
+    command = await resolve_command(transcript, "Command")
 
     execution = await execute_command(command, db)
 
@@ -174,6 +278,7 @@ def create_place(place: dict, db: Session = Depends(get_db)):
     db.add(new_place)
     db.commit()
     db.refresh(new_place)
+    invalidate_names()
 
     return new_place
 
@@ -189,6 +294,7 @@ def delete_place(id: str, db: Session = Depends(get_db)):
 
     db.delete(place)
     db.commit()
+    invalidate_names()
 
     return {"message": "Place deleted"}
 
@@ -223,6 +329,7 @@ def create_camera(camera: dict, db: Session = Depends(get_db)):
     db.add(new_camera)
     db.commit()
     db.refresh(new_camera)
+    invalidate_names()
 
     return new_camera
 
@@ -238,6 +345,7 @@ def delete_camera(id: str, db: Session = Depends(get_db)):
 
     db.delete(camera)
     db.commit()
+    invalidate_names()
 
     return {"message": "Camera deleted"}
 
@@ -262,15 +370,113 @@ def update_camera(id: str, updates: dict, db: Session = Depends(get_db)):
 
     db.commit()
     db.refresh(camera)
+    if "name" in updates:
+        invalidate_names()
 
     return camera
 
 # --- Additional Models and Logic ---
 
-# GET alerts
+# GET alerts — keyset-paginated on (timestamp, id), newest first
+ALERTS_PAGE_MAX = 500
+
+
+def _encode_cursor(alert: Alert) -> str:
+    raw = f"{alert.timestamp.isoformat()}|{alert.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, alert_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), alert_id
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
 @app.get("/alerts")
-def get_alerts(db: Session = Depends(get_db)):
-    return db.query(Alert).order_by(Alert.timestamp.desc()).all()
+def get_alerts(
+    response: Response,
+    limit: int = Query(100, ge=1, le=ALERTS_PAGE_MAX),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    since: datetime | None = Query(None, description="Only alerts raised or repeated after this timestamp"),
+    cameraId: str | None = None,
+    severity: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Newest alerts first, one page at a time.
+    Older pages: pass the X-Next-Cursor response header back as `cursor`.
+    Polling: pass the newest lastSeen already shown as `since` (lastSeen is
+    set on insert and moved by repeats, so bumped alerts come back too).
+    """
+    query = db.query(Alert)
+    if cameraId:
+        query = query.filter(Alert.cameraId == cameraId)
+    if severity:
+        query = query.filter(Alert.severity == severity)
+    if since:
+        query = query.filter(Alert.lastSeen > since)
+    if cursor:
+        timestamp, alert_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Alert.timestamp < timestamp,
+            and_(Alert.timestamp == timestamp, Alert.id < alert_id),
+        ))
+
+    # A catch-up poll matches few rows: walk ix_alerts_lastSeen and sort just
+    # those. "+timestamp" (SQLite's no-op unary plus) stops the planner from
+    # scanning ix_alerts_timestamp_id for the ORDER BY and filtering every row
+    order = literal_column("+alerts.timestamp") if since else Alert.timestamp
+    alerts = query.order_by(order.desc(), Alert.id.desc()).limit(limit + 1).all()
+    if len(alerts) > limit:
+        alerts = alerts[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(alerts[-1])
+    return alerts
+
+# Live alert push — new alerts as they are raised, no database polling
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+@app.get("/alerts/stream")
+async def stream_alerts(request: Request, last_event_id: str | None = None):
+    """
+    Server-Sent Events feed of new alerts. Browsers resume automatically via
+    the Last-Event-ID header; a "resync" event means refetch GET /alerts?since=...
+    """
+    sub = alert_hub.subscribe(request.headers.get("last-event-id") or last_event_id)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                event = await sub.next(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                id_line = f"id: {event['id']}\n" if event["id"] else ""
+                yield f"event: {event['event']}\n{id_line}data: {json.dumps(event['data'])}\n\n"
+        finally:
+            alert_hub.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/alerts/ws")
+async def alerts_websocket(websocket: WebSocket, last_event_id: str | None = None):
+    """WebSocket feed of new alerts: messages are {"event", "id", "seq", "data"}; reconnect with ?last_event_id=<id>."""
+    await websocket.accept()
+    sub = alert_hub.subscribe(last_event_id)
+    try:
+        while True:
+            event = await sub.next(timeout=STREAM_HEARTBEAT_SECONDS)
+            await websocket.send_json(event or {"event": "ping", "id": None, "data": {}})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        alert_hub.unsubscribe(sub)
+
 
 # DELETE alert
 @app.delete("/alerts/{id}")
@@ -304,6 +510,7 @@ async def receive_snapshot(camera_id: str, body: dict):
 @app.get("/settings")
 def read_settings():
     """Return all current automation settings."""
+    refresh_settings()
     return get_settings()
 
 
@@ -332,7 +539,7 @@ def write_settings(body: dict):
 
 @app.get("/automation/status")
 def automation_status():
-    """Return scheduler state: is_running, last_run_time, next_run_time, interval."""
+    """Return scheduler state: is_running, last_run_time, next_run_time, interval, pipeline stats."""
     return get_scheduler_status()
 
 
@@ -373,3 +580,15 @@ async def vms_sync(db: Session = Depends(get_db)):
     except Exception as e:
         print(f"[VMS Sync] Error: {e}")
         raise HTTPException(500, f"VMS sync failed: {e}")
+
+
+@app.get("/http/stats")
+def http_stats():
+    """Outbound HTTP client pools: requests, latency and open/idle connections per target."""
+    return get_http_stats()
+
+
+@app.get("/vms/status")
+def vms_status():
+    """VMS session state and the last background status refresh."""
+    return get_vms_sync_status()
@@ -0,0 +1,91 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+SQLite's create_all never alters existing tables, so every change to the
+models after a release gets a migration here. The applied version lives in
+PRAGMA user_version; migrate() runs each newer migration in order, one
+transaction per step. Steps are idempotent so a database freshly built by
+create_all (which already has the latest columns/indexes) migrates cleanly.
+
+To change the schema: update models.py, then append a (version, description,
+function) entry to MIGRATIONS.
+"""
+from sqlalchemy import text
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def _add_column(conn, table: str, column: str, col_type: str):
+    if column not in _columns(conn, table):
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {col_type}'))
+
+
+def _create_index(conn, name: str, table: str, columns: str):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# ── Migrations ───────────────────────────────────────────────────────────
+
+def _alert_categories(conn):
+    # Columns of the alert rule engine (automation/alert_rules.py). Databases
+    # that already gained them from an early startup-time ALTER are still at
+    # user_version 0; _add_column skips what exists, so they migrate cleanly.
+    _add_column(conn, "alerts", "category", "VARCHAR")
+    _add_column(conn, "alerts", "categories", "JSON")
+
+
+def _lookup_indexes(conn):
+    # VMS sync looks up by vendor ids, the API filters cameras by place,
+    # /alerts sorts newest-first by timestamp
+    _create_index(conn, "ix_cameras_vms_id", "cameras", "vms_id")
+    _create_index(conn, "ix_cameras_placeId", "cameras", '"placeId"')
+    _create_index(conn, "ix_places_vms_group_id", "places", "vms_group_id")
+    _create_index(conn, "ix_alerts_timestamp", "alerts", "timestamp")
+
+
+def _alert_repeats(conn):
+    _add_column(conn, "alerts", "occurrences", "INTEGER DEFAULT 1")
+    _add_column(conn, "alerts", "lastSeen", "DATETIME")
+    _create_index(conn, "ix_alerts_camera_category", "alerts", '"cameraId", category')
+
+
+def _alert_activity_index(conn):
+    # GET /alerts?since= filters on lastSeen alone, so every row needs it set
+    conn.execute(text('UPDATE alerts SET "lastSeen" = timestamp WHERE "lastSeen" IS NULL'))
+    _create_index(conn, "ix_alerts_lastSeen", "alerts", '"lastSeen"')
+    # (timestamp, id) serves the keyset ORDER BY without a temp B-tree
+    _create_index(conn, "ix_alerts_timestamp_id", "alerts", "timestamp, id")
+    conn.execute(text("DROP INDEX IF EXISTS ix_alerts_timestamp"))
+
+
+MIGRATIONS = [
+    (1, "alert rule categories", _alert_categories),
+    (2, "lookup and sort indexes", _lookup_indexes),
+    (3, "alert repeat tracking", _alert_repeats),
+    (4, "alert activity and keyset indexes", _alert_activity_index),
+]
+
+
+def get_schema_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def migrate(engine) -> int:
+    """Applies pending migrations and returns the resulting schema version."""
+    version = get_schema_version(engine)
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(text(f"PRAGMA user_version = {target}"))
+        version = target
+        print(f"[DB] Migrated schema to v{target}: {description}")
+
+    with engine.connect() as conn:
+        # Refresh planner statistics once the indexes exist
+        conn.execute(text("PRAGMA optimize"))
+    return version
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -16,7 +16,7 @@ class Place(Base):
     cameras = Column(Integer)
     lat = Column(Float, nullable=True)
     long = Column(Float, nullable=True)
-    vms_group_id = Column(Integer, nullable=True)
+    vms_group_id = Column(Integer, nullable=True, index=True)
 
 class Camera(Base):
     __tablename__ = "cameras"
@@ -25,16 +25,28 @@ class Camera(Base):
     streamUrl = Column(String)
     type = Column(String)
     status = Column(String)
-    placeId = Column(String, ForeignKey("places.id"))
-    vms_id = Column(Integer, nullable=True)
+    placeId = Column(String, ForeignKey("places.id"), index=True)
+    vms_id = Column(Integer, nullable=True, index=True)
+
+def _same_as_timestamp(context):
+    return context.get_current_parameters().get("timestamp") or datetime.utcnow()
+
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_camera_category", "cameraId", "category"),
+        Index("ix_alerts_timestamp_id", "timestamp", "id"),       # keyset pagination order
+    )
     id = Column(String, primary_key=True, default=generate_id)
     cameraId = Column(String, ForeignKey("cameras.id"))
     cameraName = Column(String)
     message = Column(String)
     severity = Column(String, default="warning")
+    category = Column(String, nullable=True)      # highest-severity matched rule
+    categories = Column(JSON, nullable=True)      # every matched rule category
     timestamp = Column(DateTime, default=datetime.utcnow)
     imagePath = Column(String)
+    occurrences = Column(Integer, default=1)      # repeats folded in by alert dedup
+    lastSeen = Column(DateTime, default=_same_as_timestamp, index=True)  # raised or last repeated
 
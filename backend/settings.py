@@ -3,8 +3,15 @@ Dynamic Automation Settings — persisted to automation_config.json.
 
 Provides get_settings() / update_settings() for the REST API,
 plus individual accessors that the scheduler & monitor import directly.
+
+Settings live in memory as an immutable snapshot (nested dicts frozen to
+MappingProxyType, lists to tuples). Accessors read that snapshot with no
+file I/O. It is swapped atomically by update_settings(), or by refresh()
+when the file's mtime changed (edited by hand); refresh() is called from
+the scheduler tick and GET /settings — never from per-camera hot paths.
 """
 import os, json, threading
+from types import MappingProxyType
 
 _CONFIG_PATH = os.path.join(os.path.dirname(__file__), "automation_config.json")
 _lock = threading.Lock()
@@ -19,10 +26,123 @@ DEFAULTS = {
         "missing PPE", "no gloves", "no mask", "no vest",
         "machine idle", "static machine", "broken yarn", "spinning malfunction"
     ],
+    # Compiled into one matcher by automation/alert_rules.py; alert_keywords not
+    # covered here become "keyword" rules with warning severity
+    "alert_rules": [
+        # Patterns match whole words — list the inflections that should count
+        {"category": "fire", "severity": "critical",
+         "patterns": ["fire", "fires", "smoke", "smoky", "smoking", "flame", "flames", "spark", "sparks",
+                      "ember", "embers", "burning", "fire or smoke"]},
+        {"category": "intrusion", "severity": "critical",
+         "patterns": ["unauthorized access", "intrusion", "intruder", "intruders", "weapon", "weapons",
+                      "climbing fence", "climbing the fence"]},
+        {"category": "suspicious", "severity": "warning",
+         "patterns": ["suspicious", "loitering", "loiterer", "unattended baggage", "unattended bag",
+                      "unattended bags"]},
+        {"category": "ppe", "severity": "warning",
+         "patterns": ["missing PPE", "no gloves", "no mask", "no vest"]},
+        {"category": "machinery", "severity": "warning",
+         "patterns": ["machine idle", "machine jammed", "static machine", "broken yarn", "spinning malfunction"]},
+        {"category": "crowd", "severity": "warning", "patterns": ["crowd", "crowds", "crowded", "crowding"]},
+        {"category": "motion", "severity": "warning", "patterns": ["motion"]},
+    ],
+    # A repeat of an open alert (same camera + category, similar message or frame,
+    # within cooldown_seconds of its last sighting) updates that row instead of
+    # creating a new alert and notification
+    "alert_dedup": {
+        "enabled": True,
+        "cooldown_seconds": 1800,
+        "min_message_similarity": 0.5,
+        "max_frame_distance": 8,
+    },
     "enable_webhook": False,
     "webhook_url": "",
     "enable_email": False,
+    # SMTP password comes from the SMTP_PASSWORD environment variable
+    "email": {
+        "smtp_host": "localhost",
+        "smtp_port": 25,
+        "starttls": False,
+        "username": "",
+        "from": "smartcamera@localhost",
+        "to": [],
+    },
+    # Alert notification dispatcher: bursts within batch_window_seconds go out as
+    # one digest; failed sends retry with exponential backoff
+    "notifications": {
+        "batch_window_seconds": 5,
+        "max_batch": 20,
+        "max_in_flight": 4,
+        "max_retries": 5,
+        "backoff_seconds": 2,
+        "max_backoff_seconds": 60,
+    },
     "automation_enabled": True,
+
+    # Monitoring pipeline: bounded queue between stages + per-stage workers/timeouts
+    "pipeline_queue_size": 32,
+    "pipeline_stages": {
+        "capture": {"concurrency": 8, "timeout_seconds": 20},
+        "gate":    {"concurrency": 4, "timeout_seconds": 5},
+        "mosaic":  {"concurrency": 1, "timeout_seconds": 180},
+        "analyze": {"concurrency": 1, "timeout_seconds": 120},
+        "alert":   {"concurrency": 2, "timeout_seconds": 15},
+    },
+
+    # Persistent per-camera stream grabbers (opt-in, see vision/stream_grabber.py)
+    "stream_grabbers_enabled": False,
+    # max_open_streams should cover the active camera count: cameras beyond it get
+    # no grabber and use one-shot capture
+    "max_open_streams": 32,
+    # Close streams nobody read from for this long. 0 = twice the monitoring
+    # interval; any value is raised above interval_seconds so streams outlive a cycle
+    "grabber_idle_seconds": 0,
+
+    # Worker processes for one-shot decoding (0 = decode in a thread; takes effect on restart)
+    "decode_workers": 0,
+
+    # EVS change detection in front of the VLM (see vision/evs_logic.py)
+    "evs_enabled": True,
+    "evs_defaults": {
+        "threshold": 15.0,          # % of pixels that must change to trigger the VLM
+        "min_interval": 5.0,        # seconds between VLM calls on the same camera
+        "max_idle_seconds": 1800,   # force an analysis at least this often
+    },
+    "evs_cameras": {},             # camera_id -> overrides of evs_defaults
+    "evs_max_cameras": 512,        # baseline slots (160x90 each); LRU-evicted beyond this, restart to apply
+
+    # In-memory cache of resized/re-encoded VLM inputs (restart to apply)
+    "preprocess_cache_mb": 64,
+
+    # Reuse VLM results for near-identical frames (perceptual hash) from the same camera
+    "vlm_cache_enabled": True,
+    "vlm_cache_ttl_seconds": 900,
+    "vlm_cache_max_distance": 4,   # max differing bits of the 64-bit dHash
+    "vlm_cache_max_reuses": 3,     # fresh inference after a verdict was reused this often (0 = until ttl)
+
+    # Parallel inferences the Ollama box can serve (match OLLAMA_NUM_PARALLEL; restart to apply)
+    "ollama_concurrency": 1,
+    # Separate lane for the command model so voice/text commands never wait
+    # behind a running vision inference (restart to apply)
+    "ollama_command_concurrency": 1,
+
+    # How long Ollama keeps a model loaded after a request, and how often the
+    # backend checks that the command/vision models are still resident (0 = never)
+    "ollama_keep_alive": "30m",
+    "ollama_residency_check_seconds": 60,
+
+    # Monitor analyzer: "combined" (one structured inference for security + mill safety)
+    # or "smart_security" (free-text security-only prompt)
+    "monitor_analyzer": "combined",
+
+    # Mosaic sweeps: screen N cameras of the same Place with one inference on a
+    # labelled grid; only flagged tiles are re-analyzed at full resolution
+    "mosaic_enabled": False,
+    "mosaic_tiles": 4,
+    "mosaic_tile_size": [320, 180],
+
+    # Cheap VMS camera-status refresh between full /vms/sync runs (0 = off)
+    "vms_status_sync_seconds": 0,
 }
 
 
@@ -46,48 +166,224 @@ def _save(data: dict):
         json.dump(data, f, indent=2)
 
 
+def _mtime() -> float | None:
+    try:
+        return os.path.getmtime(_CONFIG_PATH)
+    except OSError:
+        return None
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+# ── In-memory snapshot ──────────────────────────────────────────────────────
+
+_snapshot = _freeze(_load())
+_snapshot_mtime = _mtime()
+_version = 1
+
+
+def _swap(data: dict, mtime: float | None):
+    """Publish a new snapshot (single reference assignment — readers never see a partial one)."""
+    global _snapshot, _snapshot_mtime, _version
+    _snapshot = _freeze(data)
+    _snapshot_mtime = mtime
+    _version += 1
+
+
+def refresh() -> bool:
+    """Reload from disk if automation_config.json changed since the last load. Returns True if reloaded."""
+    mtime = _mtime()
+    if mtime == _snapshot_mtime:
+        return False
+    with _lock:
+        if mtime == _snapshot_mtime:
+            return False
+        _swap(_load(), mtime)
+    print("[Settings] Config file changed on disk — reloaded")
+    return True
+
+
+def get_version() -> int:
+    """Increments on every snapshot swap — lets derived caches know when to rebuild."""
+    return _version
+
+
 # ── Public API ──────────────────────────────────────────────────────────────
 
 def get_settings() -> dict:
-    """Return all current settings."""
-    with _lock:
-        return _load()
+    """Return all current settings (a mutable copy of the snapshot)."""
+    return _thaw(_snapshot)
 
 
 def update_settings(partial: dict) -> dict:
-    """Merge partial updates into settings and persist."""
+    """Merge partial updates into settings, persist and swap the snapshot."""
     with _lock:
-        current = _load()
+        current = _thaw(_snapshot)
         current.update(partial)
         _save(current)
+        _swap(current, _mtime())
         print(f"[Settings] Updated: {list(partial.keys())}")
-        return current
+        return _thaw(_snapshot)
 
 
 # ── Convenience accessors (used by scheduler / monitor) ─────────────────────
 
 def get_interval() -> int:
-    return get_settings().get("interval_seconds", DEFAULTS["interval_seconds"])
+    return _snapshot.get("interval_seconds", DEFAULTS["interval_seconds"])
 
 
 def get_max_screenshots() -> int:
-    return get_settings().get("max_screenshots", DEFAULTS["max_screenshots"])
+    return _snapshot.get("max_screenshots", DEFAULTS["max_screenshots"])
 
 
-def get_alert_keywords() -> list:
-    return get_settings().get("alert_keywords", DEFAULTS["alert_keywords"])
+def get_alert_keywords() -> tuple:
+    return _snapshot.get("alert_keywords", DEFAULTS["alert_keywords"])
+
+
+def get_alert_rules() -> tuple:
+    return _snapshot.get("alert_rules", DEFAULTS["alert_rules"])
 
 
 def is_automation_enabled() -> bool:
-    return get_settings().get("automation_enabled", True)
+    return _snapshot.get("automation_enabled", True)
+
+
+def get_alert_dedup_config() -> dict:
+    return {**DEFAULTS["alert_dedup"], **_snapshot.get("alert_dedup", {})}
 
 
 def is_webhook_enabled() -> bool:
-    return get_settings().get("enable_webhook", False)
+    return _snapshot.get("enable_webhook", False)
 
 
 def get_webhook_url() -> str:
-    return get_settings().get("webhook_url", "")
+    return _snapshot.get("webhook_url", "")
+
+
+def is_email_enabled() -> bool:
+    return _snapshot.get("enable_email", False)
+
+
+def get_email_config() -> dict:
+    return {**DEFAULTS["email"], **_snapshot.get("email", {})}
+
+
+def get_notification_config() -> dict:
+    return {**DEFAULTS["notifications"], **_snapshot.get("notifications", {})}
+
+
+def get_pipeline_queue_size() -> int:
+    return _snapshot.get("pipeline_queue_size", DEFAULTS["pipeline_queue_size"])
+
+
+def is_stream_grabbers_enabled() -> bool:
+    return _snapshot.get("stream_grabbers_enabled", False)
+
+
+def get_grabber_limits() -> tuple[int, float]:
+    s = _snapshot
+    interval = get_interval()
+    idle = s.get("grabber_idle_seconds", DEFAULTS["grabber_idle_seconds"]) or 2 * interval
+    return (
+        s.get("max_open_streams", DEFAULTS["max_open_streams"]),
+        max(idle, interval + 60),
+    )
+
+
+def get_decode_workers() -> int:
+    return _snapshot.get("decode_workers", DEFAULTS["decode_workers"])
+
+
+def is_evs_enabled() -> bool:
+    return _snapshot.get("evs_enabled", True)
+
+
+def get_evs_config(camera_id: str) -> dict:
+    """EVS thresholds for one camera: evs_defaults overridden by evs_cameras[camera_id]."""
+    s = _snapshot
+    return {
+        **DEFAULTS["evs_defaults"],
+        **s.get("evs_defaults", {}),
+        **s.get("evs_cameras", {}).get(camera_id, {}),
+    }
+
+
+def get_evs_max_cameras() -> int:
+    return _snapshot.get("evs_max_cameras", DEFAULTS["evs_max_cameras"])
+
+
+def get_preprocess_cache_mb() -> int:
+    return _snapshot.get("preprocess_cache_mb", DEFAULTS["preprocess_cache_mb"])
+
+
+def is_vlm_cache_enabled() -> bool:
+    return _snapshot.get("vlm_cache_enabled", True)
+
+
+def get_vlm_cache_limits() -> tuple[float, int, int]:
+    s = _snapshot
+    return (
+        s.get("vlm_cache_ttl_seconds", DEFAULTS["vlm_cache_ttl_seconds"]),
+        s.get("vlm_cache_max_distance", DEFAULTS["vlm_cache_max_distance"]),
+        s.get("vlm_cache_max_reuses", DEFAULTS["vlm_cache_max_reuses"]),
+    )
+
+
+def get_ollama_concurrency() -> int:
+    return _snapshot.get("ollama_concurrency", DEFAULTS["ollama_concurrency"])
+
+
+def get_ollama_command_concurrency() -> int:
+    return _snapshot.get("ollama_command_concurrency", DEFAULTS["ollama_command_concurrency"])
+
+
+def get_ollama_keep_alive() -> str:
+    return _snapshot.get("ollama_keep_alive", "30m")
+
+
+def get_ollama_residency_check_seconds() -> int:
+    return int(_snapshot.get("ollama_residency_check_seconds", 60))
+
+
+def get_monitor_analyzer() -> str:
+    return _snapshot.get("monitor_analyzer", DEFAULTS["monitor_analyzer"])
+
+
+def is_mosaic_enabled() -> bool:
+    return _snapshot.get("mosaic_enabled", False)
+
+
+def get_mosaic_config() -> tuple[int, tuple]:
+    s = _snapshot
+    return (
+        s.get("mosaic_tiles", DEFAULTS["mosaic_tiles"]),
+        s.get("mosaic_tile_size", DEFAULTS["mosaic_tile_size"]),
+    )
+
+
+def get_vms_status_sync_seconds() -> int:
+    return int(_snapshot.get("vms_status_sync_seconds", 0))
+
+
+def get_stage_config(stage: str) -> dict:
+    """Concurrency/timeout for one pipeline stage (saved values override defaults per key)."""
+    defaults = DEFAULTS["pipeline_stages"].get(stage, {"concurrency": 1, "timeout_seconds": None})
+    saved = _snapshot.get("pipeline_stages", {}).get(stage, {})
+    return {**defaults, **saved}
 
 
 # ── Backward-compatible constants (for any imports that still use them) ──────
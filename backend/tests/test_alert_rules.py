@@ -0,0 +1,37 @@
+from automation.alert_rules import AlertRuleEngine, summarize
+from settings import DEFAULTS
+
+engine = AlertRuleEngine(DEFAULTS["alert_rules"], DEFAULTS["alert_keywords"])
+
+
+def categories(text):
+    return [m["category"] for m in engine.classify(text)]
+
+
+def test_inflected_threat_words_still_classify():
+    assert categories("Two spindle fires burning near loom 3") == ["fire"]
+    assert categories("Crowded corridor near exit") == ["crowd"]
+    assert categories("Unattended bags left by the gate") == ["suspicious"]
+    assert categories("Intruders climbing the fence") == ["intrusion"]
+
+
+def test_whole_words_only():
+    assert categories("Motionless machine on line 2") == []
+    assert categories("Empire hall is quiet") == []
+
+
+def test_negated_findings_do_not_alert():
+    assert categories("STATUS: NORMAL. Observation: No fire or smoke visible") == []
+    assert categories("No motion anomalies, not loitering") == []
+    # Negation only reaches within its own clause
+    assert categories("No fire visible. Smoke rising from loom 4") == ["fire"]
+
+
+def test_negative_findings_are_not_negated():
+    assert categories("Worker with no mask and no gloves") == ["ppe"]
+
+
+def test_catch_all_is_never_primary():
+    matches = engine.classify("ALERT DETECTED: person loitering near gate")
+    assert summarize(matches)[1] == "suspicious"
+    assert categories("ALERT DETECTED: unusual activity") == ["vlm_alert"]
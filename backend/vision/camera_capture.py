@@ -1,11 +1,109 @@
 import cv2
 import time
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import is_stream_grabbers_enabled, get_grabber_limits, get_decode_workers, get_stage_config
+from vision.stream_grabber import grabber_pool
+from vision.decode_pool import decode_pool
+
+# Per-call limits for one-shot captures without an explicit timeout
+DEFAULT_CAPTURE_TIMEOUT = 15.0
+GRABBER_WAIT = 8.0
+
+# Captures run on their own bounded pool, not asyncio's default executor: a
+# capture that outlives its pipeline timeout keeps its thread until OpenCV
+# gives up, and must not starve the EVS / dHash / save_jpeg to_thread calls
+_capture_executor: ThreadPoolExecutor | None = None
+
+
+def _get_capture_executor() -> ThreadPoolExecutor:
+    global _capture_executor
+    if _capture_executor is None:
+        workers = get_stage_config("capture")["concurrency"]
+        _capture_executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="capture")
+    return _capture_executor
+
+
+def close_capture_executor():
+    """Drop queued captures on shutdown; running ones end at their OpenCV timeout."""
+    global _capture_executor
+    if _capture_executor is not None:
+        _capture_executor.shutdown(wait=False, cancel_futures=True)
+        _capture_executor = None
+
+
+def capture_jpeg(stream_url: str, timeout: float | None = None) -> bytes | None:
+    """
+    Capture a single frame from an RTSP or HTTP stream as an in-memory JPEG.
+
+    When stream grabbers are enabled the latest frame of a persistent
+    connection is used (instant); otherwise, or if the grabber has no frame
+    yet, the stream is opened just for this capture. `timeout` bounds the
+    whole call, including OpenCV's open and reads.
+    """
+    deadline = time.monotonic() + (timeout or DEFAULT_CAPTURE_TIMEOUT)
+    frame = None
+
+    if is_stream_grabbers_enabled():
+        grabber_pool.configure(*get_grabber_limits())
+        frame = grabber_pool.get_frame(stream_url, wait=min(GRABBER_WAIT, (timeout or DEFAULT_CAPTURE_TIMEOUT) / 2))
+        if frame is None:
+            print(f"[Capture] No grabber frame for {stream_url} — falling back to one-shot capture")
+
+    if frame is None:
+        frame = _read_frame_oneshot(stream_url, max(1.0, deadline - time.monotonic()))
+
+    if frame is None:
+        print(f"[Capture] Error: Cannot read frame from {stream_url}")
+        return None
+
+    return encode_frame(frame)
 
 
 def capture_frame(stream_url: str, save_path: str = "frame.jpg") -> str | None:
+    """Capture a single frame and write it to save_path (for callers that need a file)."""
+    data = capture_jpeg(stream_url)
+    if data is None:
+        return None
+    return save_jpeg(data, save_path)
+
+
+async def capture_jpeg_async(stream_url: str, timeout: float | None = None) -> bytes | None:
+    """
+    Non-blocking capture for the event loop. Nothing is written to disk.
+    `timeout` is passed down to OpenCV so the capture thread/process really ends.
+
+    - Stream grabbers enabled → read the latest frame on the capture pool (instant)
+    - decode_workers > 0 → decode + resize in a worker process, frame handed
+      back through shared memory; only the JPEG encode happens here (in a thread,
+      cv2 releases the GIL while encoding)
+    - otherwise → one-shot capture on the capture pool
     """
-    Capture a single frame from an RTSP or HTTP stream.
+    workers = get_decode_workers()
+    if is_stream_grabbers_enabled() or workers <= 0:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_capture_executor(), capture_jpeg, stream_url, timeout)
+
+    if not decode_pool.started:
+        decode_pool.start(workers)
+
+    handle = await decode_pool.decode(stream_url, timeout)
+    if handle is None:
+        print(f"[Capture] Error: Cannot read frame from {stream_url}")
+        return None
+
+    # Release the slot only once the encode thread is done with it, even if we get cancelled
+    encode = asyncio.ensure_future(asyncio.to_thread(encode_frame, handle.array()))
+    encode.add_done_callback(lambda _: handle.release())
+    return await asyncio.shield(encode)
+
+
+def _read_frame_oneshot(stream_url: str, timeout: float | None = None):
+    """
+    Open the stream, read one frame and release it — within `timeout` seconds
+    (OpenCV open/read timeouts plus a deadline on the frame-skipping loop).
 
     Key improvements:
     - Forces TCP transport for RTSP (prevents H264 decode_slice_header errors)
@@ -15,10 +113,16 @@ def capture_frame(stream_url: str, save_path: str = "frame.jpg") -> str | None:
 
     # Force TCP transport for RTSP streams — prevents H264 decode errors
     # from receiving mid-GOF UDP packets
+    timeout = timeout or DEFAULT_CAPTURE_TIMEOUT
+    deadline = time.monotonic() + timeout
+    timeout_ms = int(timeout * 1000)
     if stream_url.startswith("rtsp://"):
-        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = f"timeout;{timeout_ms * 1000}|rtsp_transport;tcp"
 
-    cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG)
+    cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, min(timeout_ms, 5000),
+    ])
 
     if not cap.isOpened():
         print(f"[Capture] Error: Cannot open stream {stream_url}")
@@ -27,30 +131,46 @@ def capture_frame(stream_url: str, save_path: str = "frame.jpg") -> str | None:
     # Skip more frames on RTSP (20) vs HTTP (5) to let the decoder recover
     skip = 20 if stream_url.startswith("rtsp://") else 5
     for _ in range(skip):
+        if time.monotonic() > deadline:
+            break
         cap.grab()
 
     ret, frame = cap.read()
 
-    # Retry once if frame is black or failed
-    if not ret or frame is None or frame.mean() < 1.0:
+    # Retry once if frame is black or failed (and there is time left for it)
+    if (not ret or frame is None or frame.mean() < 1.0) and deadline - time.monotonic() > 2:
         print(f"[Capture] Frame was black, retrying after 1s...")
         time.sleep(1)
         for _ in range(10):
+            if time.monotonic() > deadline:
+                break
             cap.grab()
         ret, frame = cap.read()
 
     cap.release()
 
     if not ret or frame is None:
-        print(f"[Capture] Error: Cannot read frame from {stream_url}")
         return None
+    return frame
+
 
-    # Resize frame to 720p max before saving to reduce VLM input size
+def encode_frame(frame) -> bytes:
+    """Resize to 720p max and JPEG-encode in memory — the single encode on the VLM path."""
+    # Resize frame to 720p max to reduce VLM input size
     h, w = frame.shape[:2]
     if max(h, w) > 720:
         scale = 720 / max(h, w)
         frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
 
-    cv2.imwrite(save_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    print(f"[Capture] Saved frame: {save_path} ({frame.shape[1]}x{frame.shape[0]})")
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def save_jpeg(data: bytes, save_path: str) -> str:
+    """Persist an encoded frame (alert evidence / screenshot cache)."""
+    with open(save_path, "wb") as f:
+        f.write(data)
+    print(f"[Capture] Saved frame: {save_path} ({len(data) // 1024}KB)")
     return save_path
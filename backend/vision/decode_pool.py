@@ -0,0 +1,154 @@
+"""
+Multiprocess frame decoding with shared-memory handoff.
+
+Decoding RTSP/H264 and resizing inside asyncio.to_thread() competes with the
+FastAPI event loop for the GIL. DecodePool runs the one-shot capture in a
+pool of worker PROCESSES instead:
+
+- The parent preallocates `slots` multiprocessing.shared_memory blocks,
+  each big enough for one 720p-max BGR frame
+- A worker decodes + resizes the frame and copies it into the slot it was
+  given, returning only the (h, w, c) shape — the pixels are never pickled
+- The caller gets a FrameHandle: a zero-copy NumPy view on the slot that
+  must be released (or used as a context manager) to return the slot
+
+Throughput scales with the number of worker processes (≈ CPU cores).
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FRAME_MAX_DIM = 720
+SLOT_BYTES = FRAME_MAX_DIM * FRAME_MAX_DIM * 3  # resized BGR frame always fits
+
+
+def _decode_into_slot(stream_url: str, shm_name: str, timeout: float | None = None) -> tuple | None:
+    """Worker-process entry point: decode one frame into shared memory slot `shm_name`."""
+    import cv2
+    from vision.camera_capture import _read_frame_oneshot
+
+    frame = _read_frame_oneshot(stream_url, timeout)
+    if frame is None:
+        return None
+
+    h, w = frame.shape[:2]
+    if max(h, w) > FRAME_MAX_DIM:
+        scale = FRAME_MAX_DIM / max(h, w)
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        dst = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf)
+        dst[:] = frame
+        del dst  # release the buffer export before closing
+    finally:
+        shm.close()
+    return frame.shape
+
+
+class FrameHandle:
+    """Zero-copy view of a decoded frame living in a shared-memory slot."""
+
+    def __init__(self, pool: "DecodePool", slot: int, shape: tuple):
+        self._pool = pool
+        self._slot = slot
+        self.shape = shape
+
+    def array(self) -> np.ndarray:
+        if self._slot is None:
+            raise ValueError("FrameHandle already released")
+        return np.ndarray(self.shape, dtype=np.uint8, buffer=self._pool._shms[self._slot].buf)
+
+    def release(self):
+        if self._slot is not None:
+            self._pool._free.put_nowait(self._slot)
+            self._slot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DecodePool:
+    def __init__(self):
+        self.workers = 0
+        self.decoded = 0
+        self.failed = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._shms: list[shared_memory.SharedMemory] = []
+        self._free: asyncio.Queue | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self, workers: int, slots: int = 0):
+        """Spawn `workers` decode processes and allocate the shared-memory slots."""
+        if self.started:
+            return
+        self.workers = max(1, int(workers))
+        slots = max(self.workers, int(slots) or self.workers * 2)
+
+        # spawn (not fork): the parent runs grabber threads and an event loop
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._shms = [shared_memory.SharedMemory(create=True, size=SLOT_BYTES) for _ in range(slots)]
+        self._free = asyncio.Queue()
+        for slot in range(slots):
+            self._free.put_nowait(slot)
+        print(f"[DecodePool] Started {self.workers} workers, {slots} shared-memory slots")
+
+    async def decode(self, stream_url: str, timeout: float | None = None) -> FrameHandle | None:
+        """Decode one frame of stream_url in a worker process. Caller must release the handle."""
+        slot = await self._free.get()
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self._executor, _decode_into_slot, stream_url, self._shms[slot].name, timeout)
+
+        try:
+            shape = await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # The worker keeps writing into the slot — only free it once it is done
+            fut.add_done_callback(lambda _: self._free.put_nowait(slot))
+            raise
+        except Exception as e:
+            print(f"[DecodePool] Worker error for {stream_url}: {e}")
+            shape = None
+
+        if shape is None:
+            self.failed += 1
+            self._free.put_nowait(slot)
+            return None
+
+        self.decoded += 1
+        return FrameHandle(self, slot, shape)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for shm in self._shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except (BufferError, FileNotFoundError) as e:
+                print(f"[DecodePool] Could not free slot {shm.name}: {e}")
+        self._shms = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self.started else 0,
+            "slots": len(self._shms),
+            "free_slots": self._free.qsize() if self._free else 0,
+            "decoded": self.decoded,
+            "failed": self.failed,
+        }
+
+
+decode_pool = DecodePool()
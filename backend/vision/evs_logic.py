@@ -1,68 +1,193 @@
 import cv2
 import numpy as np
 import os
+import threading
 import time
+from collections import OrderedDict
+
+from settings import get_evs_max_cameras
+
+class BaselineStore:
+    """
+    Fixed-size store of downsampled grayscale baselines.
+
+    One preallocated uint8 array of shape (capacity, h, w) holds every
+    camera's baseline; `_slots` maps camera_id -> row and doubles as the
+    LRU order. When full, the least-recently-seen camera's row is reused
+    (and `on_evict(camera_id)` is called so per-camera state can go with it).
+    Memory is capacity * w * h bytes (512 cameras at 160x90 ≈ 7 MB).
+    """
+    def __init__(self, capacity: int = 512, size: tuple[int, int] = (160, 90), on_evict=None):
+        self.capacity = max(1, int(capacity))
+        self.on_evict = on_evict
+        self.size = size  # (width, height), cv2 convention
+        self.frames = np.zeros((self.capacity, size[1], size[0]), dtype=np.uint8)
+        self.last_analysis = np.zeros(self.capacity, dtype=np.float64)
+        self.evictions = 0
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free = list(range(self.capacity - 1, -1, -1))
+
+    def get(self, camera_id: str) -> int | None:
+        """Slot of camera_id (marking it recently used), or None if it has no baseline."""
+        slot = self._slots.get(camera_id)
+        if slot is not None:
+            self._slots.move_to_end(camera_id)
+        return slot
+
+    def assign(self, camera_id: str) -> int:
+        """Allocate a slot for a new camera, evicting the least-recently-used one if full."""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            evicted, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(evicted)
+        self._slots[camera_id] = slot
+        self.last_analysis[slot] = 0.0
+        return slot
+
+    def __len__(self):
+        return len(self._slots)
+
 
 class EVSManager:
     """
     Efficient Video Sampling (EVS) Manager.
-    Reduces VLM tokens/compute by only triggering analysis when a 
+    Reduces VLM tokens/compute by only triggering analysis when a
     'Temporally Dynamic Patch' (significant change) is detected.
+
+    Baselines are small (160x90) blurred grayscale frames kept in a bounded
+    BaselineStore, so the diff costs microseconds and memory stays flat.
     """
-    def __init__(self, threshold=15.0, min_interval=5.0):
-        self.last_frames = {}  # camera_id -> grayscale_frame
-        self.last_analysis_time = {} # camera_id -> timestamp
+    def __init__(self, threshold=15.0, min_interval=5.0, max_idle_seconds=60.0,
+                 capacity=512, size=(160, 90)):
+        self.baselines = BaselineStore(capacity, size, on_evict=self._forget_camera)
         self.threshold = threshold # % pixel change threshold
         self.min_interval = min_interval # Seconds between mandatory scans
+        self.max_idle_seconds = max_idle_seconds # Max time without analysis
+        self._lock = threading.Lock()  # baseline slots are shared by gate workers
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
 
-    def should_analyze(self, camera_id: str, current_frame_path: str) -> bool:
+    def should_analyze(self, camera_id: str, current_frame: str | bytes,
+                       threshold: float | None = None,
+                       min_interval: float | None = None,
+                       max_idle_seconds: float | None = None) -> bool:
         """
         Determines if a frame represents a significant enough change to warrant VLM reasoning.
+        current_frame is a file path or an in-memory JPEG buffer.
+        Per-call thresholds override the manager defaults (per-camera settings).
         """
+        analyze, reason = self._decide(
+            camera_id, current_frame,
+            self.threshold if threshold is None else threshold,
+            self.min_interval if min_interval is None else min_interval,
+            self.max_idle_seconds if max_idle_seconds is None else max_idle_seconds,
+        )
+        self._record(camera_id, analyze, reason)
+        return analyze
+
+    def _load_small(self, image: str | bytes):
+        """Decode straight to 1/4-scale grayscale (JPEG DCT scaling), then shrink + blur."""
+        if isinstance(image, (bytes, bytearray)):
+            gray = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        else:
+            gray = cv2.imread(image, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None:
+            return None
+        small = cv2.resize(gray, self.baselines.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _decide(self, camera_id, current_frame, threshold, min_interval, max_idle_seconds) -> tuple[bool, str]:
         now = time.time()
-        
-        # Periodic check even if no motion (to ensure system is live)
-        if now - self.last_analysis_time.get(camera_id, 0) > 60: # Max 1 min without analysis
-            self.last_analysis_time[camera_id] = now
-            return True
 
-        if not os.path.exists(current_frame_path):
-            return False
+        if isinstance(current_frame, str) and not os.path.exists(current_frame):
+            return False, "missing_frame"
 
         try:
             # Load and preprocess
-            frame = cv2.imread(current_frame_path)
-            if frame is None: return False
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
-
-            if camera_id not in self.last_frames:
-                self.last_frames[camera_id] = gray
-                self.last_analysis_time[camera_id] = now
-                return True
-
-            # Calculate Absolute Difference
-            frame_delta = cv2.absdiff(self.last_frames[camera_id], gray)
-            thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-            
-            # Calculate % of pixels changed
-            change_ratio = (np.count_nonzero(thresh) / thresh.size) * 100
-            
-            # Update state
-            self.last_frames[camera_id] = gray
-
-            if change_ratio > self.threshold:
-                # Rate limit VLM to avoid spamming (e.g. min 5s between analysis)
-                if now - self.last_analysis_time.get(camera_id, 0) >= self.min_interval:
-                    print(f"[EVS] Significant change ({change_ratio:.2f}%) detected on {camera_id}. Triggering VLM.")
-                    self.last_analysis_time[camera_id] = now
-                    return True
-            
-            return False
+            small = self._load_small(current_frame)
+            if small is None: return False, "unreadable_frame"
+
+            with self._lock:
+                store = self.baselines
+                slot = store.get(camera_id)
+
+                if slot is None:
+                    slot = store.assign(camera_id)
+                    store.frames[slot] = small
+                    store.last_analysis[slot] = now
+                    return True, "first_frame"
+
+                # Calculate Absolute Difference against the baseline, then
+                # update state (baseline follows every frame, analysed or not)
+                frame_delta = cv2.absdiff(store.frames[slot], small)
+                store.frames[slot] = small
+
+                # Periodic check even if no motion (to ensure system is live)
+                if now - store.last_analysis[slot] > max_idle_seconds:
+                    store.last_analysis[slot] = now
+                    return True, "max_idle"
+
+                # Calculate % of pixels changed
+                change_ratio = (np.count_nonzero(frame_delta > 25) / frame_delta.size) * 100
+
+                if change_ratio > threshold:
+                    # Rate limit VLM to avoid spamming (e.g. min 5s between analysis)
+                    if now - store.last_analysis[slot] >= min_interval:
+                        print(f"[EVS] Significant change ({change_ratio:.2f}%) detected on {camera_id}. Triggering VLM.")
+                        store.last_analysis[slot] = now
+                        return True, "change"
+                    return False, "rate_limited"
+
+                return False, "no_change"
 
         except Exception as e:
             print(f"[EVS] Error analyzing frame: {e}")
-            return True # Default to True on error to be safe
+            return True, "error" # Default to True on error to be safe
+
+    # ── Counters (how many VLM calls EVS saved) ─────────────────────────────
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.analyzed = 0
+            self.skipped = 0
+            self.reasons = {}      # reason -> count
+            self.per_camera = {}   # camera_id -> {"analyzed": n, "skipped": n}, bounded by the baselines
+
+    def _forget_camera(self, camera_id: str):
+        with self._stats_lock:
+            self.per_camera.pop(camera_id, None)
+
+    def _record(self, camera_id: str, analyze: bool, reason: str):
+        key = "analyzed" if analyze else "skipped"
+        with self._stats_lock:
+            if analyze:
+                self.analyzed += 1
+            else:
+                self.skipped += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            cam = self.per_camera.setdefault(camera_id, {"analyzed": 0, "skipped": 0})
+            cam[key] += 1
+
+    def get_camera_stats(self, camera_id: str) -> dict:
+        with self._stats_lock:
+            return dict(self.per_camera.get(camera_id, {"analyzed": 0, "skipped": 0}))
+
+    def get_stats(self) -> dict:
+        """Aggregates only — served on every status poll, so nothing per camera."""
+        with self._stats_lock:
+            total = self.analyzed + self.skipped
+            return {
+                "analyzed": self.analyzed,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+                "reasons": dict(self.reasons),
+                "cameras": len(self.per_camera),
+                "baselines": len(self.baselines),
+                "baseline_capacity": self.baselines.capacity,
+                "baseline_evictions": self.baselines.evictions,
+            }
 
-evs_manager = EVSManager()
+evs_manager = EVSManager(capacity=get_evs_max_cameras())
@@ -0,0 +1,49 @@
+"""
+Mosaic builder for batched VLM sweeps.
+
+Tiles several low-resolution camera frames into one labelled grid image
+(A, B, C, ...) so a single llava inference can screen a whole group of
+quiet cameras. Findings are mapped back to cameras by tile label.
+"""
+import math
+import string
+
+import cv2
+import numpy as np
+
+TILE_LABELS = string.ascii_uppercase
+
+
+def build_mosaic(frames: list[bytes], tile_size: tuple[int, int] = (320, 180)) -> tuple[bytes, list[str]]:
+    """
+    Returns (mosaic JPEG bytes, labels) for up to 26 JPEG frames.
+    Tiles are laid out row-major in a ceil(sqrt(n))-column grid.
+    """
+    if not frames or len(frames) > len(TILE_LABELS):
+        raise ValueError(f"Mosaic needs 1-{len(TILE_LABELS)} frames, got {len(frames)}")
+
+    tw, th = tile_size
+    cols = math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / cols)
+    grid = np.zeros((rows * th, cols * tw, 3), dtype=np.uint8)
+    labels = list(TILE_LABELS[:len(frames)])
+
+    for i, (data, label) in enumerate(zip(frames, labels)):
+        # Half-scale JPEG decode is plenty for a thumbnail
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_REDUCED_COLOR_2)
+        if img is None:
+            continue
+        tile = cv2.resize(img, (tw, th), interpolation=cv2.INTER_AREA)
+
+        # Label box in the top-left corner of each tile
+        cv2.rectangle(tile, (0, 0), (34, 30), (0, 0, 0), -1)
+        cv2.putText(tile, label, (6, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2, cv2.LINE_AA)
+        cv2.rectangle(tile, (0, 0), (tw - 1, th - 1), (255, 255, 255), 1)
+
+        r, c = divmod(i, cols)
+        grid[r * th:(r + 1) * th, c * tw:(c + 1) * tw] = tile
+
+    ok, buf = cv2.imencode(".jpg", grid, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if not ok:
+        raise ValueError("Mosaic JPEG encoding failed")
+    return buf.tobytes(), labels
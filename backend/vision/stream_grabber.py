@@ -0,0 +1,191 @@
+"""
+Persistent per-camera stream grabbers.
+
+Opening an RTSP stream costs a TCP/RTSP handshake plus decoder warm-up
+(the 20 skipped frames in capture_frame). A StreamGrabber keeps ONE
+long-lived cv2.VideoCapture per camera and a background thread that keeps
+decoding, holding only the latest frame. Reading a frame is then instant.
+
+GrabberPool bounds the number of open streams:
+- Once max_streams are open, further cameras get no grabber (the caller falls
+  back to one-shot capture) — evicting the least-recently-used stream would,
+  on a sweep over more cameras than slots, close every stream before its
+  next use. max_open_streams should cover the active camera count.
+- Streams nobody asked for within idle_seconds are closed by a janitor thread;
+  settings derive idle_seconds from the monitoring interval so streams
+  survive from one cycle to the next
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+class StreamGrabber:
+    """Background reader that keeps only the most recent decoded frame."""
+
+    # Frames to discard after (re)connecting so the H264 decoder can recover
+    WARMUP_FRAMES = 20
+    RECONNECT_DELAY = 2.0
+
+    def __init__(self, stream_url: str):
+        self.stream_url = stream_url
+        self.last_used = time.monotonic()
+        self.frames_read = 0
+        self.reconnects = 0
+        self._frame = None
+        self._frame_time = 0.0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"grabber:{stream_url[:40]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self, wait: float = 0.0, max_age: float = 10.0):
+        """
+        Return a copy of the newest frame, waiting up to `wait` seconds for the
+        first one. Returns None if no frame arrived or the last one is stale.
+        """
+        self.last_used = time.monotonic()
+        if wait and not self._ready.is_set():
+            self._ready.wait(wait)
+        with self._lock:
+            if self._frame is None or time.monotonic() - self._frame_time > max_age:
+                return None
+            return self._frame.copy()
+
+    def _open(self):
+        if self.stream_url.startswith("rtsp://"):
+            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "timeout;5000000|rtsp_transport;tcp"
+        cap = cv2.VideoCapture(self.stream_url, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        skip = self.WARMUP_FRAMES if self.stream_url.startswith("rtsp://") else 5
+        for _ in range(skip):
+            cap.grab()
+        return cap
+
+    def _run(self):
+        cap = None
+        try:
+            while not self._stop.is_set():
+                if cap is None:
+                    cap = self._open()
+                    if cap is None:
+                        print(f"[Grabber] Cannot open stream {self.stream_url}, retrying...")
+                        self._stop.wait(self.RECONNECT_DELAY)
+                        continue
+
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    print(f"[Grabber] Stream dropped: {self.stream_url} — reconnecting")
+                    cap.release()
+                    cap = None
+                    self.reconnects += 1
+                    self._stop.wait(self.RECONNECT_DELAY)
+                    continue
+
+                # Black frames happen while the decoder recovers — keep the previous frame
+                if frame[::16, ::16].mean() < 1.0:
+                    continue
+
+                with self._lock:
+                    self._frame = frame
+                    self._frame_time = time.monotonic()
+                self.frames_read += 1
+                self._ready.set()
+        finally:
+            if cap is not None:
+                cap.release()
+
+
+class GrabberPool:
+    """Bounded set of StreamGrabbers keyed by stream URL."""
+
+    def __init__(self, max_streams: int = 32, idle_seconds: float = 120.0):
+        self.max_streams = max_streams
+        self.idle_seconds = idle_seconds
+        self.evictions = 0
+        self.overflows = 0
+        self._grabbers: OrderedDict[str, StreamGrabber] = OrderedDict()
+        self._lock = threading.Lock()
+        self._janitor: threading.Thread | None = None
+
+    def configure(self, max_streams: int, idle_seconds: float):
+        self.max_streams = max(1, int(max_streams))
+        self.idle_seconds = float(idle_seconds)
+
+    def get_frame(self, stream_url: str, wait: float = 8.0):
+        """
+        Latest frame for stream_url, starting a grabber on first use.
+        None if the pool is full (no grabber is opened — use one-shot capture).
+        """
+        with self._lock:
+            grabber = self._grabbers.get(stream_url)
+            if grabber is None:
+                if len(self._grabbers) >= self.max_streams:
+                    self.overflows += 1
+                    return None
+                grabber = StreamGrabber(stream_url)
+                grabber.start()
+                self._grabbers[stream_url] = grabber
+                print(f"[Grabber] Opened stream ({len(self._grabbers)}/{self.max_streams}): {stream_url}")
+            self._grabbers.move_to_end(stream_url)
+
+            # max_streams lowered in settings — close the least recently used
+            while len(self._grabbers) > self.max_streams:
+                url, oldest = self._grabbers.popitem(last=False)
+                oldest.stop()
+                self.evictions += 1
+                print(f"[Grabber] Evicted least-recently-used stream: {url}")
+
+            self._ensure_janitor()
+
+        return grabber.latest(wait=wait)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            for url in [u for u, g in self._grabbers.items() if now - g.last_used > self.idle_seconds]:
+                self._grabbers.pop(url).stop()
+                self.evictions += 1
+                print(f"[Grabber] Closed idle stream: {url}")
+
+    def close_all(self):
+        with self._lock:
+            for grabber in self._grabbers.values():
+                grabber.stop()
+            self._grabbers.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_streams": len(self._grabbers),
+                "max_streams": self.max_streams,
+                "idle_seconds": self.idle_seconds,
+                "evictions": self.evictions,
+                "overflows": self.overflows,
+                "reconnects": sum(g.reconnects for g in self._grabbers.values()),
+            }
+
+    def _ensure_janitor(self):
+        if self._janitor and self._janitor.is_alive():
+            return
+        self._janitor = threading.Thread(target=self._janitor_loop, name="grabber-janitor", daemon=True)
+        self._janitor.start()
+
+    def _janitor_loop(self):
+        while True:
+            time.sleep(max(5.0, self.idle_seconds / 4))
+            self.evict_idle()
+
+
+grabber_pool = GrabberPool()
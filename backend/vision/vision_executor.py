@@ -1,8 +1,10 @@
 import os
 import uuid
-from vision.camera_capture import capture_frame
+import asyncio
+from vision.camera_capture import capture_jpeg_async, save_jpeg
 from vision.evs_logic import evs_manager
 from ai.vision_llm import analyze_image, analyze_smart_security
+from ai.inference_scheduler import INTERACTIVE
 
 # Cache directory
 CACHE_DIR = "cache"
@@ -20,10 +22,10 @@ async def process_vision(camera_url: str, command: dict):
     filename = f"frame_{uuid.uuid4().hex}.jpg"
     image_path = os.path.join(CACHE_DIR, filename)
 
-    # Capture frame and save into cache folder
-    captured_path = capture_frame(camera_url, save_path=image_path)
+    # Capture frame in memory (off the event loop — the one-shot path blocks for seconds)
+    frame = await capture_jpeg_async(camera_url)
 
-    if not captured_path:
+    if not frame:
         return {
             "success": False,
             "error": "Frame capture failed"
@@ -33,18 +35,20 @@ async def process_vision(camera_url: str, command: dict):
     # If it's a manual command, we always analyze. 
     # If it's a periodic check, we use EVS.
     is_manual = command.get("manual", True)
-    if not is_manual and not evs_manager.should_analyze(camera_id, captured_path):
+    if not is_manual and not evs_manager.should_analyze(camera_id, frame):
         return {
             "success": True,
             "type": "evs_skip",
             "message": "No significant change detected. VLM analysis skipped."
         }
 
-    # Send image to VLM
+    # Keep the analysed frame as a cached screenshot for the UI, then send
+    # the same in-memory buffer to the VLM
+    captured_path = await asyncio.to_thread(save_jpeg, frame, image_path)
     if action == "smart_security":
-        result = await analyze_smart_security(captured_path)
+        result = await analyze_smart_security(frame, priority=INTERACTIVE)
     else:
-        result = await analyze_image(captured_path, command)
+        result = await analyze_image(frame, command)
 
     return {
         "success": True,
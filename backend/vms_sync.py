@@ -8,34 +8,61 @@ Authentication flow (Keycloak OIDC):
   3. POST username + password to the Keycloak action URL
   4. Keycloak redirects back to VMS with an auth code → Django session is created
   5. Use the session to fetch protected API endpoints
+
+The authenticated session (the shared "vms" client from http_clients) is reused across syncs; a 401/403 or
+a redirect back to the login page triggers one re-login and retry. Logins are serialized and numbered
+(_session_generation): a caller whose request failed on a session another caller has since replaced
+just retries on the new one, so concurrent callers never log each other out.
+VMS_BASE / VMS_USERNAME / VMS_PASSWORD can be overridden from the environment.
 """
 
+import os
+import time
+import asyncio
 import httpx
 import re
 import html
+from dotenv import load_dotenv
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
-from models import Place, Camera
+from models import Place, Camera, generate_id
+from settings import get_vms_status_sync_seconds
+from logic.name_index import invalidate_names
+from http_clients import get_client, record_error
+
+load_dotenv()
 
-VMS_BASE = "https://vms.cotcorpcontrol.in"
-VMS_USERNAME = "admin"
-VMS_PASSWORD = "admin@123"
+VMS_BASE = os.getenv("VMS_BASE", "https://vms.cotcorpcontrol.in")
+VMS_USERNAME = os.getenv("VMS_USERNAME", "admin")
+VMS_PASSWORD = os.getenv("VMS_PASSWORD", "admin@123")
+
+# Re-login proactively after this long even if the VMS still accepts the cookie
+SESSION_MAX_AGE = 8 * 3600
 
 # ── Authentication ──────────────────────────────────────────────────────────
 
-async def _get_vms_session() -> httpx.AsyncClient:
+_logged_in = False
+_session_started = 0.0
+_session_lock: asyncio.Lock | None = None
+_session_generation = 0   # bumped on every successful login
+_logins = 0
+
+
+def _url(path: str) -> str:
+    return f"{VMS_BASE}{path}"
+
+
+async def _login() -> httpx.AsyncClient:
     """
-    Creates an authenticated httpx session against the VMS Django server
-    via Keycloak OIDC login.
+    Authenticates the shared VMS client (http_clients "vms") against the VMS
+    Django server via Keycloak OIDC login. Old cookies are dropped first.
     """
-    client = httpx.AsyncClient(
-        base_url=VMS_BASE,
-        verify=False,
-        timeout=30.0,
-        follow_redirects=True,
-    )
+    global _logins
+    client = get_client("vms")
+    client.cookies.clear()
 
     # Step 1: Hit the OIDC authenticate endpoint → Keycloak login page
-    r = await client.get("/api/oidc/authenticate/?next=/api/swagger/")
+    r = await client.get(_url("/api/oidc/authenticate/?next=/api/swagger/"))
 
     # Step 2: Extract Keycloak form action URL from HTML
     form_match = re.search(r'action=["\']([^"\']+)["\']', r.text)
@@ -43,8 +70,8 @@ async def _get_vms_session() -> httpx.AsyncClient:
         raise Exception("Could not find Keycloak login form action URL")
 
     # The action URL contains HTML-encoded ampersands (&amp;)
-    keycloak_action_url = html.unescape(form_match.group(1))
-    print(f"[VMS Auth] Keycloak login URL: {keycloak_action_url[:80]}...")
+    keycloak_action_url = r.url.join(html.unescape(form_match.group(1)))
+    print(f"[VMS Auth] Keycloak login URL: {str(keycloak_action_url)[:80]}...")
 
     # Step 3: POST credentials to Keycloak
     login_data = {
@@ -61,97 +88,173 @@ async def _get_vms_session() -> httpx.AsyncClient:
     print(f"[VMS Auth] Post-login status: {r2.status_code}, URL: {str(r2.url)[:80]}")
 
     # Verify login by checking if we can access a protected page
-    test = await client.get("/api/swagger/")
-    if test.status_code != 200:
+    test = await client.get(_url("/api/swagger/"))
+    if test.status_code != 200 or _session_expired(test):
         raise Exception(f"VMS login failed — Swagger returned {test.status_code}")
 
+    _logins += 1
     print("[VMS Auth] Login successful ✓")
     return client
 
 
-async def fetch_vms_cameras(client: httpx.AsyncClient) -> list:
-    """Fetch camera list with group info from VMS."""
-    r = await client.get("/api/camera/with-group-info/?format=json")
+async def _get_vms_session(stale_generation: int | None = None) -> tuple[httpx.AsyncClient, int]:
+    """
+    Returns the shared authenticated client and its session generation,
+    logging in only when it isn't yet, the login is older than
+    SESSION_MAX_AGE, or the caller saw generation `stale_generation` expire
+    and nobody has logged in again since.
+    """
+    global _logged_in, _session_started, _session_lock, _session_generation
+    if _session_lock is None:
+        _session_lock = asyncio.Lock()
+
+    async with _session_lock:
+        expired = time.monotonic() - _session_started > SESSION_MAX_AGE
+        rejected = stale_generation is not None and stale_generation == _session_generation
+        if not _logged_in or expired or rejected:
+            _logged_in = False
+            await _login()
+            _logged_in = True
+            _session_started = time.monotonic()
+            _session_generation += 1
+        return get_client("vms"), _session_generation
+
+
+def _session_expired(r: httpx.Response) -> bool:
+    """
+    The VMS answers an expired session with 401/403, or by redirecting
+    (302) to the Keycloak login page — which the client follows to an HTML page.
+    """
+    if r.status_code in (401, 403):
+        return True
+    redirected_to_login = any(h.status_code in (301, 302, 303, 307) for h in r.history) and (
+        "/oidc/" in r.url.path or "openid-connect" in r.url.path or r.url.host != httpx.URL(VMS_BASE).host
+    )
+    return redirected_to_login
+
+
+async def _vms_get_json(path: str):
+    """GET a JSON endpoint on the shared session, re-logging in once if it expired."""
+    try:
+        client, generation = await _get_vms_session()
+        r = await client.get(_url(path))
+        if _session_expired(r):
+            print("[VMS Auth] Session expired — refreshing")
+            client, _ = await _get_vms_session(stale_generation=generation)
+            r = await client.get(_url(path))
+    except httpx.TransportError:
+        record_error("vms")
+        raise
     r.raise_for_status()
     return r.json()
 
 
-async def fetch_vms_groups(client: httpx.AsyncClient) -> dict:
+def close_vms_session():
+    """Forget the login (the client itself is closed with the other shared clients)."""
+    global _logged_in
+    _logged_in = False
+    get_client("vms").cookies.clear()
+
+
+def get_vms_session_status() -> dict:
+    return {
+        "base_url": VMS_BASE,
+        "logged_in": _logged_in,
+        "session_age_seconds": round(time.monotonic() - _session_started, 1) if _logged_in else None,
+        "logins": _logins,
+        "generation": _session_generation,
+    }
+
+
+async def fetch_vms_cameras() -> list:
+    """Fetch camera list with group info from VMS."""
+    return await _vms_get_json("/api/camera/with-group-info/?format=json")
+
+
+async def fetch_vms_groups() -> dict:
     """Fetch all groups (factories) from VMS."""
-    r = await client.get("/api/group/all-groups/?format=json")
-    r.raise_for_status()
-    return r.json()
+    return await _vms_get_json("/api/group/all-groups/?format=json")
 
 
 # ── Sync Logic ──────────────────────────────────────────────────────────────
 
+_PLACE_FIELDS = ("name", "location", "cameras", "lat", "long")
+_CAMERA_FIELDS = ("name", "streamUrl", "status", "placeId")
+
+
 async def sync_vms_to_db(db: Session) -> dict:
     """
     Main sync function:
-      1. Authenticate with VMS via Keycloak OIDC
-      2. Fetch groups → upsert as Place rows
-      3. Fetch cameras → upsert as Camera rows (linked to Place via group)
+      1. Authenticate with VMS via Keycloak OIDC (session is reused between syncs)
+      2. Fetch groups and cameras
+      3. Diff against the local Place/Camera rows and apply in one transaction
     Returns a summary dict with counts.
     """
-    client = await _get_vms_session()
+    groups_data = await fetch_vms_groups()
+    cameras_data = await fetch_vms_cameras()
+    return apply_vms_snapshot(db, groups_data.get("groups", []), cameras_data)
 
-    try:
-        groups_data = await fetch_vms_groups(client)
-        cameras_data = await fetch_vms_cameras(client)
-    finally:
-        await client.aclose()
 
-    groups = groups_data.get("groups", [])
+def apply_vms_snapshot(db: Session, groups: list, cameras_data: list) -> dict:
+    """
+    Diff-based upsert of a full VMS snapshot.
+
+    Existing rows are loaded once into dicts keyed by vms_group_id / vms_id,
+    then only new or changed rows are written with bulk INSERT/UPDATE
+    statements — no per-row SELECT, no per-place flush (ids are generated
+    client-side). Cameras that disappeared from the VMS are marked offline
+    and listed in the summary, not deleted (their alerts reference them).
+    """
+    existing_places = {
+        row.vms_group_id: row._asdict()
+        for row in db.query(Place.id, Place.vms_group_id, *(getattr(Place, f) for f in _PLACE_FIELDS))
+                     .filter(Place.vms_group_id.isnot(None))
+    }
+    existing_cams = {
+        row.vms_id: row._asdict()
+        for row in db.query(Camera.id, Camera.vms_id, *(getattr(Camera, f) for f in _CAMERA_FIELDS))
+                     .filter(Camera.vms_id.isnot(None))
+    }
 
-    # ── Upsert Groups → Places ──
-    places_created = 0
-    places_updated = 0
-    group_id_to_place = {}  # VMS group id → local Place
+    # ── Groups → Places ──
+    place_inserts, place_updates = [], []
+    group_id_to_place_id = {}  # VMS group id → local Place id
+    cam_name_to_group_id = {}  # VMS camera_name → group id
 
     for g in groups:
         vms_gid = g.get("id")
-        existing = db.query(Place).filter(Place.vms_group_id == vms_gid).first()
-
-        lat_val = _safe_float(g.get("lat"))
-        long_val = _safe_float(g.get("long"))
-        cam_count = len(g.get("cameras", []))
-
+        for cam in g.get("cameras", []):
+            cam_name_to_group_id[cam.get("camera_name")] = vms_gid
+
+        values = {
+            "name": g.get("description") or g.get("group", ""),
+            "location": g.get("address", ""),
+            "cameras": len(g.get("cameras", [])),
+            "lat": _safe_float(g.get("lat")),
+            "long": _safe_float(g.get("long")),
+        }
+        existing = existing_places.get(vms_gid)
         if existing:
-            existing.name = g.get("description") or g.get("group", "")
-            existing.location = g.get("address", "")
-            existing.lat = lat_val
-            existing.long = long_val
-            existing.cameras = cam_count
-            group_id_to_place[vms_gid] = existing
-            places_updated += 1
+            group_id_to_place_id[vms_gid] = existing["id"]
+            if _changed(existing, values):
+                place_updates.append({"id": existing["id"], **values})
         else:
-            new_place = Place(
-                name=g.get("description") or g.get("group", ""),
-                location=g.get("address", ""),
-                description=f"VMS Group: {g.get('group', '')}",
-                cameras=cam_count,
-                lat=lat_val,
-                long=long_val,
-                vms_group_id=vms_gid,
-            )
-            db.add(new_place)
-            db.flush()  # get the generated id
-            group_id_to_place[vms_gid] = new_place
-            places_created += 1
-
-    # ── Build a mapping from VMS camera_name → group_id using groups data ──
-    cam_name_to_group_id = {}
-    for g in groups:
-        for cam in g.get("cameras", []):
-            cam_name_to_group_id[cam.get("camera_name")] = g.get("id")
-
-    # ── Upsert Cameras ──
-    cams_created = 0
-    cams_updated = 0
+            place_id = generate_id()
+            group_id_to_place_id[vms_gid] = place_id
+            place_inserts.append({
+                "id": place_id,
+                "description": f"VMS Group: {g.get('group', '')}",
+                "vms_group_id": vms_gid,
+                **values,
+            })
+
+    # ── Cameras ──
+    cam_inserts, cam_updates = [], []
+    seen_vms_ids = set()
 
     for c in cameras_data:
         vms_cid = c.get("id")
-        existing = db.query(Camera).filter(Camera.vms_id == vms_cid).first()
+        seen_vms_ids.add(vms_cid)
 
         # Determine stream URL — rewrite internal K8s hostnames to public domain
         stream = _rewrite_stream_url(c.get("streaming_url", ""))
@@ -159,46 +262,135 @@ async def sync_vms_to_db(db: Session) -> dict:
             # Fallback to direct RTSP if streaming_url is empty
             stream = c.get("rtspurlmain") or ""
 
-        # Map VMS status to local status
-        status = "active" if c.get("status", "").upper() == "ON" else "offline"
-
-        # Find the parent place
         cam_name = c.get("camera_name", "")
-        gid = cam_name_to_group_id.get(cam_name)
-        place = group_id_to_place.get(gid) if gid else None
-
+        place_id = group_id_to_place_id.get(cam_name_to_group_id.get(cam_name))
+        values = {
+            "name": c.get("camera_description") or cam_name,
+            "streamUrl": stream,
+            # Map VMS status to local status
+            "status": "active" if c.get("status", "").upper() == "ON" else "offline",
+        }
+
+        existing = existing_cams.get(vms_cid)
         if existing:
-            existing.name = c.get("camera_description") or cam_name
-            existing.streamUrl = stream
-            existing.status = status
-            existing.placeId = place.id if place else existing.placeId
-            cams_updated += 1
+            values["placeId"] = place_id or existing["placeId"]
+            if _changed(existing, values):
+                cam_updates.append({"id": existing["id"], **values})
         else:
-            new_cam = Camera(
-                name=c.get("camera_description") or cam_name,
-                streamUrl=stream,
-                type="CCTV",
-                status=status,
-                placeId=place.id if place else None,
-                vms_id=vms_cid,
-            )
-            db.add(new_cam)
-            cams_created += 1
+            cam_inserts.append({"id": generate_id(), "type": "CCTV", "placeId": place_id, "vms_id": vms_cid, **values})
 
-    db.commit()
+    # Cameras removed from the VMS → deactivate
+    missing = [cam for vms_cid, cam in existing_cams.items() if vms_cid not in seen_vms_ids]
+    deactivations = [{"id": cam["id"], "status": "offline"} for cam in missing if cam["status"] != "offline"]
+
+    try:
+        if place_inserts:
+            db.execute(insert(Place), place_inserts)
+        if place_updates:
+            db.execute(update(Place), place_updates)
+        if cam_inserts:
+            db.execute(insert(Camera), cam_inserts)
+        if cam_updates or deactivations:
+            db.execute(update(Camera), cam_updates + deactivations)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if place_inserts or place_updates or cam_inserts or cam_updates:
+        invalidate_names()
 
     summary = {
-        "places_created": places_created,
-        "places_updated": places_updated,
-        "cameras_created": cams_created,
-        "cameras_updated": cams_updated,
+        "places_created": len(place_inserts),
+        "places_updated": len(place_updates),
+        "places_unchanged": len(groups) - len(place_inserts) - len(place_updates),
+        "cameras_created": len(cam_inserts),
+        "cameras_updated": len(cam_updates),
+        "cameras_unchanged": len(cameras_data) - len(cam_inserts) - len(cam_updates),
+        "cameras_deactivated": len(deactivations),
+        "cameras_missing": [{"id": cam["id"], "vms_id": cam["vms_id"], "name": cam["name"]} for cam in missing],
         "total_groups": len(groups),
         "total_cameras": len(cameras_data),
     }
-    print(f"[VMS Sync] Complete: {summary}")
+    print(f"[VMS Sync] Complete: {len(place_inserts)}+{len(place_updates)} places, "
+          f"{len(cam_inserts)}+{len(cam_updates)} cameras written, {len(missing)} missing from VMS")
     return summary
 
 
+# ── Background status sync ──────────────────────────────────────────────────
+
+_status_task: asyncio.Task | None = None
+_last_status_sync: dict | None = None
+
+
+def apply_camera_status(db: Session, cameras_data: list) -> int:
+    """Bulk-updates only the status of known cameras whose VMS status changed."""
+    current = {row.vms_id: row for row in db.query(Camera.id, Camera.vms_id, Camera.status)
+               .filter(Camera.vms_id.isnot(None))}
+    changes = []
+    for c in cameras_data:
+        row = current.get(c.get("id"))
+        status = "active" if c.get("status", "").upper() == "ON" else "offline"
+        if row and row.status != status:
+            changes.append({"id": row.id, "status": status})
+    if changes:
+        db.execute(update(Camera), changes)
+    db.commit()
+    return len(changes)
+
+
+async def _status_sync_loop():
+    global _last_status_sync
+    from database import SessionLocal
+
+    while True:
+        interval = get_vms_status_sync_seconds()
+        if interval <= 0:
+            # Disabled — check the setting again later
+            await asyncio.sleep(60)
+            continue
+
+        await asyncio.sleep(interval)
+        try:
+            cameras_data = await fetch_vms_cameras()
+            db = SessionLocal()
+            try:
+                changed = apply_camera_status(db, cameras_data)
+            finally:
+                db.close()
+            _last_status_sync = {"at": time.time(), "cameras": len(cameras_data), "changed": changed}
+            if changed:
+                print(f"[VMS Sync] Status refresh: {changed} camera(s) changed")
+        except Exception as e:
+            print(f"[VMS Sync] Status refresh failed: {e}")
+
+
+def start_status_sync():
+    """Starts the periodic camera status refresh (interval from settings, 0 = off)."""
+    global _status_task
+    if _status_task is None or _status_task.done():
+        _status_task = asyncio.create_task(_status_sync_loop())
+
+
+async def stop_status_sync():
+    global _status_task
+    if _status_task and not _status_task.done():
+        _status_task.cancel()
+        try:
+            await _status_task
+        except asyncio.CancelledError:
+            pass
+    _status_task = None
+    close_vms_session()
+
+
+def get_vms_sync_status() -> dict:
+    return {
+        **get_vms_session_status(),
+        "status_sync_seconds": get_vms_status_sync_seconds(),
+        "last_status_sync": _last_status_sync,
+    }
+
+
 # ── Helpers ─────────────────────────────────────────────────────────────────
 
 # Internal Kubernetes service hostname used inside the VMS cluster
@@ -224,6 +416,10 @@ def _rewrite_stream_url(url: str) -> str:
     return url
 
 
+def _changed(existing: dict, values: dict) -> bool:
+    return any(existing.get(k) != v for k, v in values.items())
+
+
 def _safe_float(val) -> float | None:
     """Convert a string or number to float, returning None on failure."""
     if val is None:
@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect, useMemo, useRef } from 'react';
 import Navbar from './components/Navbar';
 import Sidebar from './components/Sidebar';
 import Canvas from './components/Canvas';
@@ -12,6 +12,8 @@ import SettingsPanel from './components/SettingsPanel';
 import VideoPlayerModal from './components/VideoPlayerModal';
 import { getCameras, getPlaces, createCamera, deleteCamera, updateCamera, createPlace, deletePlace } from './api/client';
 
+const ALERTS_PAGE_SIZE = 200; // Alerts kept in the dashboard feed
+
 function App() {
   const [cameras, setCameras] = useState([]);
   const [places, setPlaces] = useState([]);
@@ -38,15 +40,37 @@ function App() {
     loadCameras();
     loadPlaces();
     loadAlerts();
-    const interval = setInterval(loadAlerts, 10000); // Polling for new intelligence
-    return () => clearInterval(interval);
+
+    // New intelligence is pushed by the backend; EventSource reconnects and resumes on its own
+    const stream = new EventSource('http://localhost:8000/alerts/stream');
+    stream.addEventListener('alert', (e) => {
+      const alert = JSON.parse(e.data);
+      latestAlertRef.current = alert.lastSeen || alert.timestamp;
+      setAlerts(prev => [alert, ...prev.filter(a => a.id !== alert.id)].slice(0, ALERTS_PAGE_SIZE));
+    });
+    // Missed too much while slow or disconnected — catch up from the API
+    stream.addEventListener('resync', loadAlerts);
+    return () => stream.close();
   }, []);
 
+  // Newest alert timestamp (or repeat) seen so far — catch-up fetches only ask for alerts after it
+  const latestAlertRef = useRef(null);
+
   const loadAlerts = async () => {
     try {
-      const resp = await fetch('http://localhost:8000/alerts');
+      const params = new URLSearchParams({ limit: String(ALERTS_PAGE_SIZE) });
+      if (latestAlertRef.current) params.set('since', latestAlertRef.current);
+      const resp = await fetch(`http://localhost:8000/alerts?${params}`);
       const data = await resp.json();
-      setAlerts(data);
+      if (!Array.isArray(data) || data.length === 0) return;
+      // Repeats keep their original position, so the newest activity may be further down
+      latestAlertRef.current = data
+        .map(a => a.lastSeen || a.timestamp)
+        .reduce((max, t) => (t > max ? t : max));
+      setAlerts(prev => {
+        const fresh = new Set(data.map(a => a.id));
+        return [...data, ...prev.filter(a => !fresh.has(a.id))].slice(0, ALERTS_PAGE_SIZE);
+      });
     } catch (err) {
       console.error('Failed to load alerts:', err);
     }
@@ -77,6 +77,11 @@ export default function SmartAlertsPanel({ alerts }) {
                                                     </span>
                                                 )}
                                                 <h3 className="text-zinc-200 font-bold">{alert.cameraName}</h3>
+                                                {alert.occurrences > 1 && (
+                                                    <span className="px-1.5 py-0.5 bg-zinc-800 text-zinc-400 text-[10px] font-bold rounded">
+                                                        ×{alert.occurrences}
+                                                    </span>
+                                                )}
                                             </div>
                                             <div className="flex items-center gap-1.5 text-zinc-500 text-xs">
                                                 <Clock size={12} />